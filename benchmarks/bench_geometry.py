@@ -0,0 +1,73 @@
+"""Taille et temps de conversion GeoJSON -> TopoJSON simplifié
+
+    python benchmarks/bench_geometry.py [departements.geojson]
+
+Sans fichier, une grille synthétique de départements aux frontières
+irrégulières (chaque frontière partagée par deux cases).
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geometry import TOLERANCES, to_topojson  # noqa: E402
+
+
+def grille_geojson(nx=10, ny=10, points=200, bruit=0.01, seed=0):
+    """FeatureCollection de nx × ny cases de 1° aux côtés bruités"""
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 1, points)[1:-1]
+    cotes = {}
+
+    def cote(a, b):
+        # Même tracé (parcouru dans un sens ou dans l'autre) pour les deux voisins
+        if (b, a) in cotes:
+            return cotes[(b, a)][::-1]
+        if (a, b) not in cotes:
+            a_, b_ = np.array(a, float), np.array(b, float)
+            normale = np.array([-(b_ - a_)[1], (b_ - a_)[0]])
+            milieu = a_ + t[:, None] * (b_ - a_) + \
+                rng.normal(0, bruit, len(t))[:, None] * normale
+            cotes[(a, b)] = np.vstack([a_, milieu, b_])
+        return cotes[(a, b)]
+
+    features = []
+    for i in range(nx):
+        for j in range(ny):
+            coins = [(i, j), (i + 1, j), (i + 1, j + 1), (i, j + 1)]
+            anneau = np.vstack([cote(coins[k], coins[(k + 1) % 4])[:-1]
+                                for k in range(4)] + [np.array(coins[:1], float)])
+            features.append({
+                'type': 'Feature',
+                'properties': {'code': f'{i * ny + j + 1:02d}', 'nom': f'D{i}-{j}',
+                               'autre': 'x' * 20},
+                'geometry': {'type': 'Polygon', 'coordinates': [anneau.tolist()]},
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def main(chemin=None):
+    if chemin:
+        with open(chemin, encoding='utf-8') as f:
+            geojson = json.load(f)
+    else:
+        geojson = grille_geojson()
+    taille = len(json.dumps(geojson, separators=(',', ':')))
+    print(f"GeoJSON: {len(geojson['features'])} départements, {taille / 1e3:.0f} Ko")
+    print(f"{'niveau':<8} {'tolérance':>9} {'arcs':>6} {'points':>8} {'Ko':>7} {'s':>6}")
+    for niveau, tolerance in TOLERANCES.items():
+        debut = time.perf_counter()
+        topo = to_topojson(geojson, tolerance)
+        duree = time.perf_counter() - debut
+        octets = len(json.dumps(topo, separators=(',', ':')))
+        points = sum(len(a) for a in topo['arcs'])
+        print(f"{niveau:<8} {tolerance:9.3f} {len(topo['arcs']):6d} {points:8d} "
+              f"{octets / 1e3:7.0f} {duree:6.2f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,88 @@
+"""Pic mémoire de analyze_prenoms, référence vs version actuelle
+
+    python benchmarks/bench_memory.py [nb_lignes] [--base REV]
+
+Les deux versions tournent sur le même DataFrame synthétique. La référence
+est script.py à la révision `--base` (par défaut le premier commit du
+dépôt), lu avec git show.
+"""
+import argparse
+import ast
+import gc
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from script import analyze_prenoms  # noqa: E402
+from synthetic import generate, to_script_columns  # noqa: E402
+
+
+def git(*args):
+    return subprocess.run(['git', *args], cwd=RACINE, capture_output=True,
+                          text=True, check=True).stdout
+
+
+def charger_reference(rev):
+    """Fonctions de script.py à la révision `rev`, sans le code de module
+
+    Le script d'origine lit dpt2020.csv et configure Altair à l'import :
+    seuls les imports et les définitions de fonctions sont exécutés.
+    """
+    arbre = ast.parse(git('show', f'{rev}:script.py'))
+    arbre.body = [noeud for noeud in arbre.body if isinstance(
+        noeud, (ast.Import, ast.ImportFrom, ast.FunctionDef))]
+    module = types.ModuleType(f'script_{rev}')
+    exec(compile(arbre, f'{rev}:script.py', 'exec'), module.__dict__)
+    return module
+
+
+def analyse_reference(module, df):
+    """analyze_prenoms de la référence, sans l'affichage (.show())"""
+    df_clean = module.clean_data(df)
+    return (module.create_temporal_visualizations(df_clean),
+            module.create_regional_visualizations(df_clean),
+            module.create_gender_visualizations(df_clean))
+
+
+def mesurer(fonction):
+    """(durée en s, pic mémoire tracemalloc en octets) de fonction()"""
+    gc.collect()
+    tracemalloc.start()
+    debut = time.perf_counter()
+    fonction()
+    duree = time.perf_counter() - debut
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duree, pic
+
+
+def main(n_rows=1_000_000, base=None):
+    base = base or git('rev-list', '--max-parents=0', 'HEAD').split()[0]
+    reference = charger_reference(base)
+    df = to_script_columns(generate(n_rows, names=5000))
+    # La référence ne reconnaît que les sexes 'M' / 'F' (pas les codes 1 / 2)
+    df['sexe'] = df['sexe'].map({1: 'M', 2: 'F'})
+    taille = df.memory_usage(deep=True).sum() / 1e6
+
+    t_ref, pic_ref = mesurer(lambda: analyse_reference(reference, df))
+    t_act, pic_act = mesurer(lambda: analyze_prenoms(df, show=False))
+
+    print(f"lignes: {n_rows:,}  données: {taille:.1f} Mo")
+    print(f"{'version':<20} {'durée (s)':>10} {'pic (Mo)':>10}")
+    print(f"{'référence ' + base[:7]:<20} {t_ref:10.2f} {pic_ref / 1e6:10.1f}")
+    print(f"{'actuelle':<20} {t_act:10.2f} {pic_act / 1e6:10.1f}")
+    print(f"pic actuel / référence: {pic_act / pic_ref:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('n_rows', nargs='?', type=int, default=1_000_000)
+    parser.add_argument('--base', help="révision de référence (git)")
+    args = parser.parse_args()
+    main(args.n_rows, args.base)
@@ -0,0 +1,33 @@
+"""Passage à l'échelle de l'agrégation régionale selon le nombre de processus
+
+    python benchmarks/bench_parallel.py [nb_lignes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate, to_script_columns  # noqa: E402
+from dataset import clean_data  # noqa: E402
+from rollup import RollupCube  # noqa: E402
+
+
+def main(n_rows=5_000_000):
+    dataset = clean_data(to_script_columns(generate(n_rows, names=5000)))
+    n_cpu = os.cpu_count()
+    jobs = sorted({1, 2, 4, 8, 16, 32, n_cpu} & set(range(1, n_cpu + 1)))
+
+    print(f"lignes: {n_rows:,}  cœurs: {n_cpu}")
+    reference = None
+    for n_jobs in jobs:
+        cube = RollupCube(dataset)  # cube neuf : pas de résultat en cache
+        debut = time.perf_counter()
+        cube.nom_dpt_sexe((2010, 2020), n_jobs=n_jobs)
+        duree = time.perf_counter() - debut
+        reference = reference or duree
+        print(f"n_jobs={n_jobs:3d}  {duree:7.3f} s  accélération x{reference / duree:.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000)
@@ -0,0 +1,58 @@
+"""Index de trajectoires : voisins exacts vs approchés, familles
+
+    python benchmarks/bench_similarity.py [nb_lignes] [nb_prenoms]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity import TrajectoryIndex  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+
+def chrono(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return resultat, time.perf_counter() - debut
+
+
+def main(n_rows=2_000_000, names=30_000, k=10):
+    df = generate(n_rows, names=names)
+    index, t = chrono(lambda: TrajectoryIndex(df))
+    print(f"lignes: {n_rows:,}  prénoms indexés: {len(index):,}  "
+          f"construction: {t:.3f} s")
+
+    requetes = index.names[:100].tolist()
+    # Première requête approchée : construction des listes inversées
+    _, t = chrono(lambda: index.neighbors(requetes[:1], k, approx=True))
+    print(f"listes inversées (~√n familles): {t:.3f} s")
+
+    exact, t_exact = chrono(lambda: index.neighbors(requetes, k))
+    approche, t_approx = chrono(lambda: index.neighbors(requetes, k, approx=True))
+    _, t_un = chrono(lambda: index.neighbors(requetes[:1], k))
+    _, t_un_approx = chrono(lambda: index.neighbors(requetes[:1], k, approx=True))
+    assert not (exact['prénom'] == exact['voisin']).any()
+    rappel = np.mean([
+        len(set(e['voisin']) & set(a['voisin'])) / k
+        for (_, e), (_, a) in zip(exact.groupby('prénom', sort=False),
+                                  approche.groupby('prénom', sort=False))])
+    print(f"1 requête: exact {t_un * 1000:.2f} ms, approché "
+          f"{t_un_approx * 1000:.2f} ms  100 requêtes: exact "
+          f"{t_exact * 1000:.1f} ms, approché {t_approx * 1000:.1f} ms "
+          f"(rappel@{k} {rappel:.2f})")
+
+    _, t = chrono(lambda: index.neighbor_graph(k))
+    print(f"graphe des {k} voisins de tous les prénoms: {t:.2f} s")
+    _, t = chrono(lambda: index.neighbor_graph(k, approx=True))
+    print(f"graphe approché: {t:.2f} s")
+
+    familles, t = chrono(lambda: index.clusters(12))
+    print(f"12 familles: {t:.2f} s, tailles {np.bincount(familles['cluster'])}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
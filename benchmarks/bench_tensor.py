@@ -0,0 +1,98 @@
+"""Tenseur de comptes vs groupby pandas (top N, pourcentages, CV, ratio M/F)
+
+    python benchmarks/bench_tensor.py [nb_lignes]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset import clean_data  # noqa: E402
+from rollup import RollupCube  # noqa: E402
+from script import prepare_regional_data  # noqa: E402
+from synthetic import generate, to_script_columns  # noqa: E402
+from tensor_backend import CountTensor  # noqa: E402
+
+PERIODE = (2010, 2020)
+
+
+def verifier(resultats):
+    """Calculs où le tenseur n'est pas plus rapide que pandas"""
+    return [nom for nom, t_p, t_t in resultats if t_t >= t_p]
+
+
+def chrono(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return resultat, time.perf_counter() - debut
+
+
+def variation_pandas(regional, noms):
+    """Calcul de create_regional_visualizations (graphique de variance)"""
+    data = regional[regional['prénom'].isin(noms)]
+    data = data.groupby('prénom', observed=True).agg(
+        {'pourcentage': ['mean', 'std'], 'nombre': 'sum'}).reset_index()
+    data.columns = ['prénom', 'mean_pct', 'std_pct', 'total']
+    data['cv'] = data['std_pct'] / data['mean_pct']
+    return data
+
+
+def main(n_rows=2_000_000):
+    dataset = clean_data(to_script_columns(generate(n_rows)))
+
+    tenseur, t_construction = chrono(lambda: CountTensor(dataset))
+    print(f"lignes: {n_rows:,}  construction du tenseur: {t_construction:.3f} s")
+    print(f"{'calcul':<20} {'pandas (s)':>11} {'tenseur (s)':>12}")
+    resultats = []
+
+    cube = RollupCube(dataset)
+    top_p, t_p = chrono(lambda: cube.top_prenoms(10, sexe='F'))
+    top_t, t_t = chrono(lambda: tenseur.top_names(10, sexe='F'))
+    assert top_p == top_t
+    print(f"{'top_prenoms':<20} {t_p:11.3f} {t_t:12.4f}")
+    resultats.append(('top_prenoms', t_p, t_t))
+
+    reg_p, t_p = chrono(lambda: prepare_regional_data(dataset, PERIODE))
+    reg_t, t_t = chrono(lambda: tenseur.regional_share(PERIODE))
+    cles = ['dpt', 'prénom', 'sexe']
+    a = reg_p.sort_values(cles, ignore_index=True)
+    b = reg_t.sort_values(cles, ignore_index=True)
+    assert np.array_equal(a['nombre'], b['nombre'])
+    assert np.allclose(a['pourcentage'], b['pourcentage'])
+    print(f"{'pourcentage':<20} {t_p:11.3f} {t_t:12.4f}")
+    resultats.append(('pourcentage', t_p, t_t))
+
+    noms = cube.top_prenoms(10)
+    var_p, t_p = chrono(lambda: variation_pandas(reg_p, noms))
+    var_t, t_t = chrono(lambda: tenseur.regional_variation(noms, PERIODE))
+    var_p = var_p.sort_values('prénom', ignore_index=True)
+    assert np.allclose(var_p['cv'], var_t['cv'], equal_nan=True)
+    print(f"{'cv régional':<20} {t_p:11.3f} {t_t:12.4f}")
+    resultats.append(('cv régional', t_p, t_t))
+
+    noms = cube.gender_mix.mixed(min_per_sex=100, limit=15)
+    # Cube neuf : l'index des prénoms mixtes est reconstruit
+    ratio_p, t_p = chrono(
+        lambda: RollupCube(dataset).gender_mix.log_ratio_series(noms))
+    (noms_t, ratio_t), t_t = chrono(lambda: tenseur.mf_ratio(noms))
+    attendu = ratio_p.pivot_table(index='prénom', columns='années',
+                                  values='ratio_mf', observed=True)
+    obtenu = pd.DataFrame(ratio_t, index=noms_t, columns=tenseur.annees)
+    assert np.allclose(attendu.to_numpy(),
+                       obtenu.loc[attendu.index.astype(str),
+                                  attendu.columns].to_numpy(), equal_nan=True)
+    print(f"{'ratio M/F':<20} {t_p:11.3f} {t_t:12.4f}")
+    resultats.append(('ratio M/F', t_p, t_t))
+
+    # Le tenseur doit rester plus rapide que pandas sur chaque calcul
+    lents = verifier(resultats)
+    if lents:
+        raise SystemExit(f"Tenseur plus lent que pandas : {', '.join(lents)}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
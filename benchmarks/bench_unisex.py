@@ -0,0 +1,46 @@
+"""Pyramide des prénoms mixtes : apply ligne à ligne vs version vectorisée
+
+    python benchmarks/bench_unisex.py [nb_lignes]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate  # noqa: E402
+from unisex import pyramid_frame  # noqa: E402
+
+
+def pyramid_apply(df, names):
+    """Ancienne version de saf_viz3.py (lambda par ligne)"""
+    filtered = df[df['preusuel'].isin(names)]
+    grouped = filtered.groupby(['preusuel', 'sexe', 'annais'], as_index=False,
+                               observed=True)['nombre'].sum()
+    grouped['nombre_signed'] = grouped.apply(
+        lambda row: -row['nombre'] if row['sexe'] == 2 else row['nombre'], axis=1
+    )
+    grouped['sexe'] = grouped['sexe'].astype(str)
+    return grouped
+
+
+def chrono(fonction, *args):
+    debut = time.perf_counter()
+    resultat = fonction(*args)
+    return time.perf_counter() - debut, len(resultat)
+
+
+def main(n_rows=1_000_000):
+    df = generate(n_rows, names=5000)
+    vocabulaire = list(df['preusuel'].cat.categories)
+
+    print(f"{'prénoms':>8} {'lignes':>9} {'apply (s)':>10} {'vectorisé (s)':>14}")
+    for n_noms in (11, 100, 1000, len(vocabulaire)):
+        noms = vocabulaire[:n_noms]
+        t_vec, lignes = chrono(pyramid_frame, df, noms)
+        t_apply = chrono(pyramid_apply, df, noms)[0]
+        print(f"{n_noms:8d} {lignes:9d} {t_apply:10.3f} {t_vec:14.3f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
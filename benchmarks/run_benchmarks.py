@@ -0,0 +1,209 @@
+"""Temps et pic mémoire de chaque étape de l'analyse sur des données synthétiques
+
+    python benchmarks/run_benchmarks.py --rows 1000000 -o rapport.json
+    python benchmarks/run_benchmarks.py --rows 1000000 --compare ancien.json
+
+Le rapport JSON (versions, paramètres, une entrée par étape) se compare
+d'une version du code à l'autre avec --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+import script  # noqa: E402
+from data_loader import load_prenoms  # noqa: E402
+from dataset import clean_data  # noqa: E402
+from dominants import DominantIndex, dominant_map_chart  # noqa: E402
+from lazy import scan_prenoms  # noqa: E402
+from modern_trad import DptTable, aggregate_selection  # noqa: E402
+from synthetic import DEPARTEMENTS, to_script_columns, write_csv  # noqa: E402
+
+
+def _lignes(resultat):
+    """Nombre de lignes d'un résultat (somme sur les tuples de tables)"""
+    if isinstance(resultat, (tuple, list)):
+        tailles = [_lignes(r) for r in resultat]
+        return None if None in tailles else sum(tailles)
+    return len(resultat) if hasattr(resultat, '__len__') else None
+
+
+def mesurer(fonction, repeat=1):
+    """(résultat, meilleur temps en s, pic mémoire tracemalloc en Mo)
+
+    Le pic est mesuré sur une exécution à part : tracemalloc ralentit
+    les allocations et fausserait les temps.
+    """
+    durees = []
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+        del resultat
+
+    tracemalloc.start()
+    resultat = fonction()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultat, min(durees), pic / 1e6
+
+
+def etapes(csv_path, cache_dir, annee):
+    """Liste ordonnée (nom, fonction, entrée) ; l'entrée est un nom d'étape"""
+    res = {}
+
+    def brut():
+        return res['load_warm']
+
+    def propre():
+        return res['clean_data']
+
+    def table():
+        return res['streamlit_table']
+
+    def index():
+        return res['dominant_index']
+
+    def selection():
+        dpts = sorted(table().dpts)[:2]
+        noms = brut()['preusuel'].value_counts().index
+        return aggregate_selection(table(), tuple(dpts),
+                                   tuple(noms[:9]), tuple(noms[-6:]))
+
+    liste = [
+        ('load_cold', lambda: load_prenoms(csv_path, cache_dir, rebuild=True), None),
+        ('load_warm', lambda: load_prenoms(csv_path, cache_dir), 'load_cold'),
+        ('scan_two_dpts', lambda: scan_prenoms(csv_path, cache_dir).filter(
+            dpt=DEPARTEMENTS[:2]).collect(), 'load_cold'),
+        ('clean_data', lambda: clean_data(to_script_columns(brut())), 'load_warm'),
+        ('prepare_temporal', lambda: script.prepare_temporal_data(propre()), 'clean_data'),
+        ('prepare_regional', lambda: script.prepare_regional_data(propre()), 'clean_data'),
+        ('prepare_gender', lambda: script.prepare_gender_data(propre()), 'clean_data'),
+        ('create_temporal', lambda: script.create_temporal_visualizations(propre()), 'clean_data'),
+        ('create_regional', lambda: script.create_regional_visualizations(propre()), 'clean_data'),
+        ('create_gender', lambda: script.create_gender_visualizations(propre()), 'clean_data'),
+        ('streamlit_table', lambda: DptTable(brut()), 'load_warm'),
+        ('streamlit_aggregate', selection, 'streamlit_table'),
+        ('dominant_index', lambda: DominantIndex(brut()), 'load_warm'),
+        ('dominant_map', lambda: dominant_map_chart(index(), annee).to_dict(), 'dominant_index'),
+    ]
+    return res, liste
+
+
+def _requises(liste, only):
+    """Étapes demandées et, de proche en proche, celles dont elles dépendent"""
+    entrees = {nom: entree for nom, _, entree in liste}
+    requises = set(entrees if only is None else only)
+    for nom in list(requises):
+        while entrees.get(nom):
+            nom = entrees[nom]
+            requises.add(nom)
+    return requises
+
+
+def _version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'],
+                              cwd=RACINE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(rows=1_000_000, names=30_000, departments=len(DEPARTEMENTS),
+        years=(1900, 2020), skew=1.1, seed=0, repeat=3, only=None):
+    """Exécute les étapes et renvoie le rapport (dict sérialisable en JSON)"""
+    params = {'rows': rows, 'names': names, 'departments': departments,
+              'years': list(years), 'skew': skew, 'seed': seed,
+              'repeat': repeat}
+    rapport = {
+        'version': _version(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'stages': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'synthetique.csv')
+        write_csv(csv_path, rows=rows, names=names, departments=departments,
+                  years=years, skew=skew, seed=seed)
+        rapport['csv_mb'] = os.path.getsize(csv_path) / 1e6
+
+        res, liste = etapes(csv_path, os.path.join(tmp, 'cache'), years[1])
+        requises = _requises(liste, only)
+        for nom, fonction, entree in liste:
+            if nom not in requises:
+                continue
+            resultat, duree, pic = mesurer(fonction, repeat)
+            res[nom] = resultat
+            rapport['stages'][nom] = {
+                'seconds': round(duree, 4),
+                'peak_mb': round(pic, 2),
+                'rows_in': _lignes(res[entree]) if entree else None,
+                'rows_out': _lignes(resultat),
+            }
+            print(f"{nom:<20} {duree:8.3f} s {pic:9.1f} Mo", file=sys.stderr)
+        res.clear()
+    return rapport
+
+
+def comparer(ancien, nouveau):
+    """Tableau texte des écarts de temps et de mémoire entre deux rapports"""
+    lignes = [f"{'étape':<20} {'temps':>17} {'mémoire':>19}"]
+    for nom, n in nouveau['stages'].items():
+        a = ancien['stages'].get(nom)
+        if a is None:
+            lignes.append(f"{nom:<20} {'(nouvelle)':>17}")
+            continue
+        lignes.append(
+            f"{nom:<20} {n['seconds']:7.3f} s x{n['seconds'] / max(a['seconds'], 1e-9):5.2f}"
+            f" {n['peak_mb']:8.1f} Mo x{n['peak_mb'] / max(a['peak_mb'], 1e-9):5.2f}")
+    return '\n'.join(lignes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--names', type=int, default=30_000)
+    parser.add_argument('--departments', type=int, default=len(DEPARTEMENTS))
+    parser.add_argument('--years', default='1900-2020')
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help="étapes à mesurer")
+    parser.add_argument('-o', '--output', help="fichier du rapport JSON")
+    parser.add_argument('--compare', help="rapport JSON de référence")
+    args = parser.parse_args(argv)
+
+    rapport = run(rows=args.rows, names=args.names,
+                  departments=args.departments,
+                  years=tuple(map(int, args.years.split('-'))),
+                  skew=args.skew, seed=args.seed, repeat=args.repeat,
+                  only=args.only)
+    texte = json.dumps(rapport, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(texte + '\n')
+    else:
+        print(texte)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(comparer(json.load(f), rapport), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
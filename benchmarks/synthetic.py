@@ -0,0 +1,74 @@
+"""Jeux de données synthétiques au schéma INSEE (sexe;preusuel;annais;dpt;nombre)
+
+    python benchmarks/synthetic.py sortie.csv --rows 3700000 --names 30000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Codes des départements métropolitains, de la Corse et des DOM
+DEPARTEMENTS = ([f'{i:02d}' for i in range(1, 96) if i != 20] +
+                ['2A', '2B', '971', '972', '973', '974', '976'])
+
+
+def generate(rows=1_000_000, names=30_000, departments=len(DEPARTEMENTS),
+             years=(1900, 2020), skew=1.1, seed=0):
+    """DataFrame au schéma de load_prenoms (types et catégories compris)
+
+    Les prénoms suivent une loi de Zipf d'exposant `skew` ; les lignes
+    sont uniques par (sexe, preusuel, annais, dpt), comme dans le fichier
+    INSEE, donc le résultat peut compter un peu moins de `rows` lignes.
+    """
+    rng = np.random.default_rng(seed)
+    poids = 1 / np.arange(1, names + 1) ** skew
+    dpts = (DEPARTEMENTS + [f'D{i}' for i in range(len(DEPARTEMENTS), departments)]
+            )[:departments]
+
+    df = pd.DataFrame({
+        'sexe': rng.integers(1, 3, rows).astype(np.int8),
+        'preusuel': rng.choice(names, rows, p=poids / poids.sum()),
+        'annais': rng.integers(years[0], years[1] + 1, rows).astype(np.int16),
+        'dpt': rng.integers(0, departments, rows),
+        'nombre': rng.integers(3, 500, rows).astype(np.int32),
+    })
+    df = df.groupby(['sexe', 'preusuel', 'annais', 'dpt'], as_index=False,
+                    sort=False)['nombre'].sum()
+    df['preusuel'] = pd.Categorical.from_codes(
+        df['preusuel'], [f'PRENOM{i:06d}' for i in range(names)])
+    df['dpt'] = pd.Categorical(np.asarray(dpts)[df['dpt']])
+    return df
+
+
+def to_script_columns(df):
+    """Mêmes données avec les noms de colonnes de script.py"""
+    out = df.copy()
+    out.columns = ['sexe', 'prénom', 'années', 'dpt', 'nombre']
+    return out
+
+
+def write_csv(path, rare_share=0.01, unknown_year_share=0.01, seed=0, **kwargs):
+    """Écrit un CSV INSEE, avec des lignes _PRENOMS_RARES et XXXX à filtrer"""
+    df = generate(seed=seed, **kwargs)
+    df = df.astype({'preusuel': str, 'annais': str, 'dpt': str})
+    rng = np.random.default_rng(seed + 1)
+    df.loc[rng.random(len(df)) < rare_share, 'preusuel'] = '_PRENOMS_RARES'
+    df.loc[rng.random(len(df)) < unknown_year_share, 'annais'] = 'XXXX'
+    df.to_csv(path, sep=';', index=False)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--names', type=int, default=30_000)
+    parser.add_argument('--departments', type=int, default=len(DEPARTEMENTS))
+    parser.add_argument('--years', default='1900-2020')
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_csv(args.path, rows=args.rows, names=args.names,
+              departments=args.departments,
+              years=tuple(map(int, args.years.split('-'))),
+              skew=args.skew, seed=args.seed)
@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+import altair as alt
+import pandas as pd
+
+# ============================================================================
+# DONNÉES COMPACTES POUR LES GRAPHIQUES ALTAIR
+# ============================================================================
+#
+# Chaque graphique n'embarque que les colonnes utilisées par ses encodages,
+# avec des entiers réduits et des flottants arrondis. Les données sont
+# ensuite transmises en CSV (sans répéter les clés de chaque ligne comme le
+# JSON par enregistrements) : inclus dans la spécification, ou écrits une
+# seule fois par contenu dans un répertoire et référencés par URL.
+
+
+def compact(df, columns, decimals=4):
+    """Sous-ensemble `columns` de `df`, avec des types numériques réduits"""
+    out = {}
+    for col in columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.cat.remove_unused_categories()
+        elif pd.api.types.is_integer_dtype(s):
+            s = pd.to_numeric(s, downcast='integer')
+        elif pd.api.types.is_float_dtype(s):
+            # Le JSON/CSV écrit tous les chiffres : on arrondit plutôt
+            # qu'on ne passe en float32
+            s = s.round(decimals)
+        out[col] = s.reset_index(drop=True)
+    return pd.DataFrame(out)
+
+
+def dataset_hash(df):
+    """Empreinte du contenu (colonnes et valeurs) d'un DataFrame"""
+    h = hashlib.sha1(','.join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class ChartDataStore:
+    """Données des graphiques en CSV, incluses ou en fichiers partagés"""
+
+    def __init__(self, directory=None, url_prefix=None, compress=False):
+        self.directory = directory
+        self.url_prefix = directory if url_prefix is None else url_prefix
+        # Copie .csv.gz à côté du .csv, pour les serveurs statiques qui
+        # servent des fichiers précompressés (Content-Encoding: gzip)
+        self.compress = compress
+        self.fichiers = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def register(self, df):
+        """Référence Altair vers les données de `df` (CSV inclus ou URL)"""
+        if self.directory is None:
+            return alt.InlineData(values=df.to_csv(index=False),
+                                  format=alt.CsvDataFormat(type='csv'))
+        # Un fichier par contenu : les graphiques qui partagent des
+        # données pointent vers le même fichier
+        nom = f'{dataset_hash(df)}.csv'
+        if nom not in self.fichiers:
+            chemin = os.path.join(self.directory, nom)
+            df.to_csv(chemin, index=False)
+            if self.compress:
+                df.to_csv(chemin + '.gz', index=False, compression='gzip')
+            self.fichiers[nom] = chemin
+        return alt.UrlData(url=f'{self.url_prefix.rstrip("/")}/{nom}',
+                           format=alt.CsvDataFormat(type='csv'))
+
+    def attach(self, charts):
+        """Remplace les données DataFrame des graphiques par leur version CSV
+
+        `charts` est le dictionnaire renvoyé par analyze_prenoms (ou toute
+        structure de graphiques imbriqués dans des dict/tuple/list).
+        """
+        if isinstance(charts, dict):
+            return {k: self.attach(v) for k, v in charts.items()}
+        if isinstance(charts, (tuple, list)):
+            return type(charts)(self.attach(c) for c in charts)
+        if isinstance(getattr(charts, 'data', None), pd.DataFrame):
+            return charts.properties(data=self.register(charts.data))
+        return charts
+
+
+def spec_size(chart):
+    """Taille (en octets) de la spécification Vega-Lite d'un graphique"""
+    return len(chart.to_json(indent=None).encode())
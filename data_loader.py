@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# ============================================================================
+# CHARGEMENT PARTAGÉ DE dpt2020.csv AVEC CACHE COLONNAIRE
+# ============================================================================
+#
+# Le CSV INSEE (sexe;preusuel;annais;dpt;nombre) est converti une seule fois
+# en un répertoire de fichiers .npy (un par colonne) ouverts ensuite en
+# mmap. `sexe`, `annais` et `nombre` sont stockés en petits entiers,
+# `preusuel` et `dpt` en codes de dictionnaire + liste des catégories.
+# Les lignes sont triées par (dpt, annais) et meta.json donne les bornes de
+# chaque département : un filtre par département ou par année ne lit que les
+# tranches concernées (voir lazy.py).
+#
+# Les publications annuelles suivantes (dpt2021.csv...) s'ajoutent au cache
+# avec ingest.py : elles sont notées dans meta.json et rejouées à chaque
+# reconstruction. `version` identifie les données (CSV de base puis
+# publications) ; les fichiers dérivés écrits dans le cache s'y réfèrent.
+
+DEFAULT_CSV = 'dpt2020.csv'
+CACHE_FORMAT = 3
+
+COLONNES = ['sexe', 'preusuel', 'annais', 'dpt', 'nombre']
+_ENTIERS = {'sexe': np.int8, 'annais': np.int16, 'nombre': np.int32}
+_CATEGORIES = {'preusuel': np.int32, 'dpt': np.int16}
+
+
+def default_cache_dir(csv_path):
+    """Répertoire de cache associé à un fichier CSV"""
+    dossier, fichier = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(dossier, '.cache_prenoms',
+                        os.path.splitext(fichier)[0])
+
+
+def _file_hash(path, bloc=1 << 20):
+    """Empreinte sha1 du contenu d'un fichier"""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for morceau in iter(lambda: f.read(bloc), b''):
+            h.update(morceau)
+    return h.hexdigest()
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def iter_csv(csv_path, chunksize=None):
+    """Lit le CSV INSEE par morceaux, sans _PRENOMS_RARES ni années XXXX
+
+    Les morceaux gardent `preusuel` et `dpt` en chaînes (les catégories
+    différeraient d'un morceau à l'autre). Sans `chunksize`, un seul morceau.
+    """
+    lecteur = pd.read_csv(
+        csv_path, sep=';',
+        dtype={'sexe': 'int8', 'preusuel': 'str', 'annais': 'str',
+               'dpt': 'str', 'nombre': 'int32'},
+        # « NA », « NAN »... sont des prénoms, pas des valeurs manquantes
+        keep_default_na=False,
+        chunksize=chunksize
+    )
+    for df in ([lecteur] if chunksize is None else lecteur):
+        df = df[(df['preusuel'] != '_PRENOMS_RARES') & (df['annais'] != 'XXXX')]
+        yield pd.DataFrame({
+            'sexe': df['sexe'].to_numpy(np.int8),
+            'preusuel': df['preusuel'].to_numpy(),
+            'annais': df['annais'].astype(np.int16).to_numpy(),
+            'dpt': df['dpt'].to_numpy(),
+            'nombre': df['nombre'].to_numpy(np.int32),
+        })
+
+
+def read_csv(csv_path):
+    """Lit le CSV INSEE et retire _PRENOMS_RARES et les années XXXX"""
+    df = next(iter_csv(csv_path))
+    df['preusuel'] = pd.Categorical(df['preusuel'])
+    df['dpt'] = pd.Categorical(df['dpt'])
+    return df
+
+
+def write_columns(df, dossier):
+    """Écrit un DataFrame typé au format colonnaire du cache"""
+    os.makedirs(dossier, exist_ok=True)
+    for col in COLONNES:
+        if col in _CATEGORIES:
+            cat = df[col].astype('category').cat
+            np.save(os.path.join(dossier, f'{col}.codes.npy'),
+                    cat.codes.to_numpy(_CATEGORIES[col]))
+            with open(os.path.join(dossier, f'{col}.categories.json'), 'w',
+                      encoding='utf-8') as f:
+                json.dump([str(c) for c in cat.categories], f,
+                          ensure_ascii=False)
+        else:
+            np.save(os.path.join(dossier, f'{col}.npy'),
+                    df[col].to_numpy(_ENTIERS[col]))
+
+
+def read_array(dossier, col, mmap_mode='r'):
+    """Tableau brut d'une colonne du cache (codes pour preusuel et dpt)"""
+    fichier = f'{col}.codes.npy' if col in _CATEGORIES else f'{col}.npy'
+    return np.load(os.path.join(dossier, fichier), mmap_mode=mmap_mode)
+
+
+def read_categories(dossier, col):
+    """Liste des catégories d'une colonne codée (preusuel ou dpt)"""
+    with open(os.path.join(dossier, f'{col}.categories.json'),
+              encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_columns(dossier, columns=None, mmap_mode='r'):
+    """Ouvre (en mmap) les colonnes d'un cache écrit par write_columns"""
+    data = {}
+    for col in columns or COLONNES:
+        if col in _CATEGORIES:
+            data[col] = pd.Categorical.from_codes(
+                read_array(dossier, col, mmap_mode), read_categories(dossier, col))
+        else:
+            data[col] = read_array(dossier, col, mmap_mode)
+    return pd.DataFrame(data, copy=False)
+
+
+def sort_rows(df):
+    """Lignes triées par (dpt, annais) et bornes [début, fin) de chaque dpt"""
+    dpt = df['dpt'].cat.codes.to_numpy()
+    ordre = np.lexsort((df['annais'].to_numpy(), dpt))
+    df = df.take(ordre).reset_index(drop=True)
+    bornes = np.searchsorted(dpt[ordre],
+                             np.arange(len(df['dpt'].cat.categories) + 1))
+    offsets = {str(c): [int(d), int(f)] for c, d, f in
+               zip(df['dpt'].cat.categories, bornes[:-1], bornes[1:])}
+    return df, offsets
+
+
+def apply_release(df, release):
+    """Remplace dans `df` les années présentes dans `release`
+
+    Les lignes de ces années sont retirées puis celles de `release`
+    ajoutées (années nouvelles ou révisées). Renvoie, comme sort_rows, les
+    lignes triées et les bornes des départements.
+    """
+    garde = ~np.isin(df['annais'].to_numpy(), np.unique(release['annais']))
+    parties = [df[garde], release]
+    data = {}
+    for col in COLONNES:
+        if col in _CATEGORIES:
+            data[col] = union_categoricals(
+                [pd.Categorical(p[col]) for p in parties],
+                sort_categories=True).remove_unused_categories()
+        else:
+            data[col] = np.concatenate([p[col].to_numpy(_ENTIERS[col])
+                                        for p in parties])
+    return sort_rows(pd.DataFrame(data))
+
+
+def release_version(version, release_sha1):
+    """Version des données après l'ajout d'une publication"""
+    return hashlib.sha1(f'{version}:{release_sha1}'.encode()).hexdigest()
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    chemin = os.path.join(cache_dir, 'meta.json')
+    with open(chemin + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(chemin + '.tmp', chemin)
+
+
+def _fichier_inchange(path, note):
+    """(inchangé, stat à jour) pour un fichier noté {size, mtime_ns, sha1}"""
+    stat = _source_stat(path)
+    if stat == {'size': note.get('size'), 'mtime_ns': note.get('mtime_ns')}:
+        return True, False
+    # Fichier touché mais peut-être identique : on tranche par le contenu
+    if ('size' in note and stat['size'] != note['size']) or \
+            _file_hash(path) != note['sha1']:
+        return False, False
+    note.update(stat)
+    return True, True
+
+
+def cache_is_fresh(csv_path, cache_dir):
+    """Vrai si le cache correspond encore au CSV source et aux publications
+
+    Chaque fichier est comparé par taille et mtime, puis par sha1 s'il a
+    été touché.
+    """
+    meta = _read_meta(cache_dir)
+    if meta is None or meta.get('format') != CACHE_FORMAT:
+        return False
+    a_noter = False
+    for path, note in [(csv_path, meta['source'])] + [
+            (r['path'], r) for r in meta.get('releases', [])]:
+        inchange, touche = _fichier_inchange(path, note)
+        if not inchange:
+            return False
+        a_noter |= touche
+    if a_noter:
+        _write_meta(cache_dir, meta)
+    return True
+
+
+def data_version(cache_dir):
+    """Identifiant des données du cache (source et publications ajoutées)"""
+    return _read_meta(cache_dir)['version']
+
+
+def write_cache(df, offsets, cache_dir, meta, extra=None):
+    """Écrit un cache complet (colonnes, meta.json) et remplace l'ancien
+
+    `extra(dossier)` écrit d'autres fichiers avant le remplacement
+    atomique du répertoire.
+    """
+    tmp = f'{cache_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    write_columns(df, tmp)
+    _write_meta(tmp, {'format': CACHE_FORMAT, 'rows': len(df),
+                      'dpt_offsets': offsets, **meta})
+    if extra is not None:
+        extra(tmp)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp, cache_dir)
+    return cache_dir
+
+
+def build_cache(csv_path=DEFAULT_CSV, cache_dir=None, releases=None):
+    """Convertit le CSV en cache colonnaire et renvoie son répertoire
+
+    Les publications `releases` (par défaut celles notées dans le cache
+    existant) sont rejouées dans l'ordre après le CSV de base.
+    """
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    if releases is None:
+        releases = (_read_meta(cache_dir) or {}).get('releases', [])
+    df, offsets = sort_rows(read_csv(csv_path))
+    version = _file_hash(csv_path)
+    source = {'path': os.path.abspath(csv_path), 'sha1': version,
+              **_source_stat(csv_path)}
+
+    rejouees = []
+    for release in releases:
+        stat = _source_stat(release['path'])
+        sha1 = _file_hash(release['path'])
+        df, offsets = apply_release(df, read_csv(release['path']))
+        version = release_version(version, sha1)
+        rejouees.append({**release, 'sha1': sha1, **stat})
+
+    return write_cache(df, offsets, cache_dir, {
+        'version': version, 'source': source, 'releases': rejouees})
+
+
+def load_prenoms(csv_path=DEFAULT_CSV, cache_dir=None, columns=None,
+                 rebuild=False):
+    """Charge les données nettoyées depuis le cache (reconstruit si besoin)
+
+    Les prénoms rares et les années XXXX sont déjà retirés ; `sexe` (1/2),
+    `annais` et `nombre` sont des entiers, `preusuel` et `dpt` des
+    catégories.
+    """
+    return read_columns(ensure_cache(csv_path, cache_dir, rebuild), columns)
+
+
+def ensure_cache(csv_path=DEFAULT_CSV, cache_dir=None, rebuild=False):
+    """Répertoire d'un cache à jour pour `csv_path` (reconstruit si besoin)"""
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    if rebuild or not cache_is_fresh(csv_path, cache_dir):
+        build_cache(csv_path, cache_dir)
+    return cache_dir
+
+
+if __name__ == '__main__':
+    import sys
+
+    chemin = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV
+    print(f"Cache écrit dans {build_cache(chemin)}")
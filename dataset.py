@@ -0,0 +1,83 @@
+import pandas as pd
+
+# ============================================================================
+# JEU DE DONNÉES VALIDÉ ET TYPÉ
+# ============================================================================
+#
+# clean_data produit une seule fois un PrenomsDataset dont les colonnes ont
+# déjà le bon type ; les fonctions en aval le consomment tel quel, sans
+# copie défensive ni nouvelle conversion de `années`.
+
+COLONNES = ['sexe', 'prénom', 'années', 'dpt', 'nombre']
+SEXES = ['M', 'F']  # codes INSEE 1 et 2
+
+
+class PrenomsDataset:
+    """Données de prénoms nettoyées (colonnes de script.py), en lecture seule"""
+
+    def __init__(self, df):
+        manquantes = set(COLONNES) - set(df.columns)
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes : {sorted(manquantes)}")
+        for col in ('années', 'nombre'):
+            if not pd.api.types.is_integer_dtype(df[col]):
+                raise TypeError(f"La colonne '{col}' doit être entière")
+        if not isinstance(df['sexe'].dtype, pd.CategoricalDtype):
+            raise TypeError("La colonne 'sexe' doit être catégorielle (M/F)")
+        self._df = df
+
+    @property
+    def df(self):
+        return self._df
+
+    def __len__(self):
+        return len(self._df)
+
+
+def _to_int(col):
+    """Convertit une colonne en entiers (NaN conservés si non convertible)"""
+    if pd.api.types.is_integer_dtype(col):
+        return col
+    col = pd.to_numeric(col, errors='coerce')
+    if col.isna().any():
+        return col
+    return col.astype('int32' if col.max() < 2 ** 31 else 'int64')
+
+
+def _to_sexe(col):
+    """Codes INSEE 1/2 ou libellés M/F vers une catégorie M/F"""
+    if isinstance(col.dtype, pd.CategoricalDtype) and list(
+            col.cat.categories) == SEXES:
+        return col
+    if pd.api.types.is_integer_dtype(col):
+        return pd.Series(pd.Categorical.from_codes(col.to_numpy() - 1, SEXES),
+                         index=col.index)
+    return col.astype(pd.CategoricalDtype(SEXES))
+
+
+def clean_data(df):
+    """Nettoie et prépare les données
+
+    Renvoie un PrenomsDataset. Les colonnes déjà bien typées (celles de
+    load_prenoms) sont reprises sans copie.
+    """
+    if isinstance(df, PrenomsDataset):
+        return df
+
+    # Nettoyage des noms de colonnes si nécessaire (sans toucher à `df`)
+    colonnes = {nom.strip(): df[nom] for nom in df.columns}
+
+    # Conversion des types
+    colonnes['années'] = _to_int(colonnes['années'])
+    colonnes['nombre'] = _to_int(colonnes['nombre'])
+    colonnes['sexe'] = _to_sexe(colonnes['sexe'])
+    df_clean = pd.DataFrame(colonnes, copy=False)
+
+    # Suppression des valeurs nulles
+    nulles = df_clean['années'].isna() | df_clean['nombre'].isna()
+    if nulles.any():
+        df_clean = df_clean[~nulles]
+        df_clean = df_clean.assign(années=df_clean['années'].astype('int16'),
+                                   nombre=df_clean['nombre'].astype('int64'))
+
+    return PrenomsDataset(df_clean)
@@ -0,0 +1,269 @@
+"""Prénoms dominants par département et cartes associées
+
+    python dominants.py --csv dpt2020.csv --geojson departements.geojson \\
+        --out carte_dominants.html --autoplay
+"""
+import argparse
+import colorsys
+import json
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from chart_data import compact
+from data_loader import DEFAULT_CSV, load_prenoms
+from geometry import DEFAULT_GEOJSON, geo_data, shared_geometry
+from parallel import parallel_groupby_sum
+
+# ============================================================================
+# INDEX DES PRÉNOMS DOMINANTS PAR (ANNÉE, DÉPARTEMENT)
+# ============================================================================
+#
+# Un seul groupby puis un tri lexicographique (année, dpt, -nombre) sur
+# toutes les données ; on ne garde que les k premiers prénoms de chaque
+# (année, dpt). Les lignes d'une année étant contiguës, la table d'une
+# année s'obtient par un simple découpage en O(nombre de départements).
+
+
+class DominantIndex:
+    """Top-k des prénoms par (annais, dpt), pour toutes les années"""
+
+    def __init__(self, df, k=3, n_jobs=1):
+        # n_jobs != 1 : agrégation répartie par département (parallel.py)
+        if n_jobs != 1:
+            agg = parallel_groupby_sum(df, ['annais', 'dpt', 'preusuel'],
+                                       partition='dpt', n_jobs=n_jobs)
+        else:
+            agg = df.groupby(['annais', 'dpt', 'preusuel'], observed=True)[
+                'nombre'].sum().reset_index()
+        annais = agg['annais'].to_numpy()
+        dpt = agg['dpt'].cat.codes.to_numpy()
+        nombre = agg['nombre'].to_numpy()
+
+        # Tri par année, département puis nombre décroissant
+        # (à égalité, ordre alphabétique du prénom : tri stable)
+        ordre = np.lexsort((-nombre, dpt, annais))
+        annais, dpt, nombre = annais[ordre], dpt[ordre], nombre[ordre]
+
+        # Rang de chaque ligne dans son groupe (annais, dpt)
+        debut_groupe = np.r_[True, (annais[1:] != annais[:-1]) |
+                             (dpt[1:] != dpt[:-1])]
+        positions = np.arange(len(ordre))
+        rang = positions - np.maximum.accumulate(
+            np.where(debut_groupe, positions, 0))
+        garde = rang < k
+
+        self.k = k
+        self.annais = annais[garde]
+        self.rang = rang[garde].astype(np.int8)
+        self.nombre = nombre[garde]
+        self.dpt = pd.Categorical.from_codes(
+            dpt[garde], agg['dpt'].cat.categories)
+        self.preusuel = pd.Categorical.from_codes(
+            agg['preusuel'].cat.codes.to_numpy()[ordre][garde],
+            agg['preusuel'].cat.categories)
+
+        # Bornes de chaque année dans les tableaux triés (un index vide
+        # n'a aucune année : toutes les requêtes renvoient des tables vides)
+        self.annees = np.unique(self.annais)
+        self._bornes = np.r_[np.searchsorted(self.annais, self.annees),
+                             len(self.annais)]
+
+    def _tranche(self, year):
+        i = np.searchsorted(self.annees, year)
+        if i == len(self.annees) or self.annees[i] != year:
+            return slice(0, 0)
+        return slice(self._bornes[i], self._bornes[i + 1])
+
+    def dominants(self, year, k=1):
+        """Prénoms dominants par département pour une année (dpt, preusuel, nombre)"""
+        if k > self.k:
+            raise ValueError(f"L'index ne contient que le top {self.k}")
+        t = self._tranche(year)
+        garde = self.rang[t] < k
+        resultat = pd.DataFrame({
+            'dpt': self.dpt[t][garde],
+            'preusuel': self.preusuel[t][garde],
+            'nombre': self.nombre[t][garde],
+        })
+        if k > 1:
+            resultat['rang'] = self.rang[t][garde] + 1
+        return resultat
+
+    def table(self, k=1):
+        """Top-k de toutes les années (annais, dpt, preusuel, nombre)"""
+        garde = self.rang < k
+        return pd.DataFrame({
+            'annais': self.annais[garde],
+            'dpt': self.dpt[garde],
+            'preusuel': self.preusuel[garde],
+            'nombre': self.nombre[garde],
+        })
+
+
+def dominant_map_chart(index, year, geo_url='departements.geojson'):
+    """Carte du prénom dominant par département pour une année
+
+    `geo_url` : GeoJSON, ou TopoJSON partagé par toutes les cartes
+    (geometry.shared_geometry).
+    """
+    dominants = index.dominants(year)
+
+    return alt.Chart(geo_data(geo_url)).mark_geoshape(
+        stroke='lightgray'
+    ).transform_lookup(
+        lookup='properties.code',
+        from_=alt.LookupData(dominants, 'dpt', ['preusuel', 'nombre'])
+    ).encode(
+        color=alt.Color('preusuel:N', title='Prénom dominant'),
+        tooltip=[
+            alt.Tooltip('properties.nom:N', title='Département'),
+            alt.Tooltip('preusuel:N', title='Prénom'),
+            alt.Tooltip('nombre:Q', title='Nombre')
+        ]
+    ).project('mercator').properties(
+        width=700,
+        height=600,
+        title=f'Prénom dominant par département en {year}'
+    )
+
+
+def palette(n):
+    """`n` couleurs distinctes : teintes espacées du nombre d'or, trois clartés
+
+    Au-delà de 20 valeurs, category20 réutilise ses couleurs et deux
+    prénoms dominants seraient confondus sur la carte.
+    """
+    teintes = (np.arange(n) * 0.618033988749895) % 1
+    clartes = np.array([0.45, 0.65, 0.3])[np.arange(n) % 3]
+    return ['#%02x%02x%02x' % tuple(round(c * 255) for c in colorsys.hls_to_rgb(
+        h, l, 0.7)) for h, l in zip(teintes, clartes)]
+
+
+def dominant_map_all_years(index, geo_url='departements.geojson', year=None,
+                           inline_geo=False):
+    """Carte des prénoms dominants de toutes les années en une spécification
+
+    Les dominants de chaque (année, département) sont inclus une fois ; un
+    paramètre `annee` lié à un curseur filtre l'année affichée dans le
+    navigateur (aucun aller-retour Python). Les couleurs sont fixées sur
+    tous les prénoms de la période pour rester stables d'une année à
+    l'autre, avec une couleur propre à chaque prénom (voir palette).
+    """
+    if len(index.annees) == 0:
+        raise ValueError("Index des dominants vide : aucune année à afficher")
+    table = compact(index.table(k=1), ['annais', 'dpt', 'preusuel', 'nombre'])
+    noms = sorted(table['preusuel'].unique())
+    couleurs = alt.Scale(domain=noms, scheme='category20') if len(noms) <= 20 \
+        else alt.Scale(domain=noms, range=palette(len(noms)))
+    debut, fin = int(index.annees[0]), int(index.annees[-1])
+    annee = alt.param(name='annee', value=fin if year is None else int(year),
+                      bind=alt.binding_range(min=debut, max=fin, step=1,
+                                             name='Année '))
+    # CSV inclus : dpt reste une chaîne ('01'), les nombres sont typés
+    donnees = alt.InlineData(
+        values=table.to_csv(index=False),
+        format=alt.CsvDataFormat(type='csv',
+                                 parse={'annais': 'number', 'nombre': 'number'}))
+
+    return alt.Chart(donnees).mark_geoshape(
+        stroke='lightgray'
+    ).add_params(annee).transform_filter(
+        alt.datum.annais == annee
+    ).transform_lookup(
+        lookup='dpt',
+        from_=alt.LookupData(geo_data(geo_url, inline=inline_geo),
+                             'properties.code'),
+        as_='geo'
+    ).encode(
+        shape='geo:G',
+        color=alt.Color('preusuel:N', title='Prénom dominant',
+                        scale=couleurs,
+                        legend=alt.Legend(columns=2, symbolLimit=0)),
+        tooltip=[
+            alt.Tooltip('geo.properties.nom:N', title='Département'),
+            alt.Tooltip('preusuel:N', title='Prénom'),
+            alt.Tooltip('nombre:Q', title='Nombre')
+        ]
+    ).project('mercator').properties(
+        width=700,
+        height=600,
+        title=alt.Title(alt.ExprRef(
+            expr="'Prénom dominant par département en ' + annee"))
+    )
+
+
+_HTML = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <title>{titre}</title>
+  <script src="https://cdn.jsdelivr.net/npm/vega@{vega}"></script>
+  <script src="https://cdn.jsdelivr.net/npm/vega-lite@{vegalite}"></script>
+  <script src="https://cdn.jsdelivr.net/npm/vega-embed@{vegaembed}"></script>
+</head>
+<body>
+  <button id="lecture">Lecture</button>
+  <div id="carte"></div>
+  <script>
+    vegaEmbed('#carte', {spec}).then(function (resultat) {{
+      var view = resultat.view, timer = null, bouton = document.getElementById('lecture');
+      function suivante() {{
+        var annee = view.signal('annee');
+        view.signal('annee', annee >= {fin} ? {debut} : annee + 1).runAsync();
+      }}
+      function basculer() {{
+        if (timer) {{ clearInterval(timer); timer = null; bouton.textContent = 'Lecture'; }}
+        else {{ timer = setInterval(suivante, {intervalle}); bouton.textContent = 'Pause'; }}
+      }}
+      bouton.onclick = basculer;
+      if ({autoplay}) basculer();
+    }});
+  </script>
+</body>
+</html>
+"""
+
+
+def save_dominant_map_html(chart, path, autoplay=False, interval_ms=400,
+                           title='Prénoms dominants par département'):
+    """Page HTML statique de la carte de dominant_map_all_years
+
+    Un bouton lecture/pause fait défiler les années dans le navigateur ;
+    `autoplay` démarre la lecture au chargement. Seuls Vega, Vega-Lite et
+    vega-embed sont chargés (CDN) : aucun serveur Python n'est nécessaire.
+    """
+    spec = chart.to_dict()
+    curseur = spec['params'][0]['bind']
+    html = _HTML.format(
+        titre=title, vega=alt.VEGA_VERSION, vegalite=alt.VEGALITE_VERSION,
+        vegaembed=alt.VEGAEMBED_VERSION,
+        spec=json.dumps(spec, ensure_ascii=False, separators=(',', ':')),
+        debut=curseur['min'], fin=curseur['max'], intervalle=int(interval_ms),
+        autoplay='true' if autoplay else 'false')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--geojson', default=DEFAULT_GEOJSON)
+    parser.add_argument('--geo-level', default='medium')
+    parser.add_argument('--out', default='carte_dominants.html')
+    parser.add_argument('--year', type=int, default=None,
+                        help="année affichée au chargement (défaut : la dernière)")
+    parser.add_argument('--autoplay', action='store_true')
+    parser.add_argument('--interval', type=int, default=400,
+                        help="millisecondes entre deux années en lecture")
+    args = parser.parse_args()
+
+    # Géométrie simplifiée incluse dans la page : un seul fichier à publier
+    index = DominantIndex(load_prenoms(args.csv))
+    chart = dominant_map_all_years(
+        index, shared_geometry(args.geojson, args.geo_level), args.year,
+        inline_geo=True)
+    save_dominant_map_html(chart, args.out, args.autoplay, args.interval)
+    print(args.out)
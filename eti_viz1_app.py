@@ -1,20 +1,80 @@
+import os
+
 import streamlit as st
-import pandas as pd
 import altair as alt
 
+from data_loader import load_prenoms
+from modern_trad import DptTable, aggregate_selection, aggregate_types
+from name_eras import load_name_eras
+from name_index import load_name_index
+from query_client import ENV_URL, QueryClient
+
 # -------------------- Chargement des données --------------------
+# Ressources partagées entre toutes les sessions (pas de copie par rerun).
+# Avec PRENOMS_QUERY_URL, les agrégats viennent de query_server.py : une
+# seule copie des données pour tous les processus Streamlit.
+QUERY_URL = os.environ.get(ENV_URL)
 
 
-@st.cache_data
+@st.cache_resource
 def load_data():
-    df = pd.read_csv("dpt2020.csv", sep=";")
-    df = df[df["preusuel"] != "_PRENOMS_RARES"]
-    df = df[df["annais"] != "XXXX"]
-    df["annais"] = df["annais"].astype(int)
-    return df
+    return load_prenoms("dpt2020.csv")
+
+
+@st.cache_resource
+def load_table():
+    return DptTable(load_data())
+
+
+@st.cache_resource
+def query_client():
+    return QueryClient(QUERY_URL)
+
+
+@st.cache_resource
+def dpts_options():
+    return query_client().dpts() if QUERY_URL else load_table().dpts
+
+
+@st.cache_resource
+def name_index():
+    return load_name_index("dpt2020.csv")
+
+
+@st.cache_resource
+def era_types():
+    # Type de chaque prénom, aligné sur les codes de la table par département
+    return load_name_eras("dpt2020.csv").type_codes(load_table().prenoms)
+
+
+# Agrégats mis en cache par sélection, avec éviction des plus anciennes
+@st.cache_data(max_entries=256)
+def aggregate(dpts, prenoms_trad, prenoms_modern):
+    if QUERY_URL:
+        return query_client().modern_trad(dpts, prenoms_trad, prenoms_modern)
+    return aggregate_selection(load_table(), dpts, prenoms_trad, prenoms_modern)
 
 
-df = load_data()
+@st.cache_data(max_entries=256)
+def aggregate_eras(dpts):
+    if QUERY_URL:
+        return query_client().modern_trad(dpts, eras=True)
+    return aggregate_types(load_table(), dpts, era_types())
+
+
+def name_picker(label, key, default):
+    """Recherche au fil de la frappe + sélection parmi les résultats
+
+    Seuls les résultats de la recherche et les prénoms déjà choisis sont
+    envoyés au navigateur, pas tout le vocabulaire.
+    """
+    st.session_state.setdefault(key, default)
+    requete = st.text_input(f"Rechercher ({label.lower()})", key=f"{key}_q")
+    resultats = name_index().search(requete, limit=50)
+    choisis = st.session_state[key]
+    return st.multiselect(
+        label, choisis + [n for n in resultats if n not in choisis], key=key)
+
 
 # -------------------- Interface Streamlit --------------------
 st.title("Évolution des prénoms modernes vs traditionnels")
@@ -22,45 +82,41 @@ st.title("Évolution des prénoms modernes vs traditionnels")
 # Choix des départements
 dpts = st.multiselect(
     "Départements à comparer (codes INSEE)",
-    sorted(df['dpt'].unique()),
+    dpts_options(),
     default=["75", "85"]
 )
 
-# Choix des prénoms traditionnels
-prenoms_trad = st.multiselect(
-    "Prénoms traditionnels",
-    sorted(df['preusuel'].unique()),
-    default=[
-        'JEAN', 'PIERRE', 'MICHEL', 'CLAUDE', 'PAUL', 'MARIE',
-        'CATHERINE', 'FRANÇOIS', 'GÉRARD'
-    ]
-)
-
-# Choix des prénoms modernes
-prenoms_modern = st.multiselect(
-    "Prénoms modernes",
-    sorted(df['preusuel'].unique()),
-    default=[
-        'EMMA', 'LÉO', 'LOUISE', 'MILA', 'NOAH', 'MAËL'
-    ]
-)
+# Tous les prénoms classés par les données (name_eras.py), ou des listes
+tous = st.radio(
+    "Prénoms comparés",
+    ["Tous les modernes vs tous les traditionnels", "Sélection manuelle"],
+    index=1
+).startswith("Tous")
+
+if not tous:
+    # Choix des prénoms traditionnels
+    prenoms_trad = name_picker(
+        "Prénoms traditionnels", "prenoms_trad",
+        ['JEAN', 'PIERRE', 'MICHEL', 'CLAUDE', 'PAUL', 'MARIE',
+         'CATHERINE', 'FRANÇOIS', 'GÉRARD']
+    )
+
+    # Choix des prénoms modernes
+    prenoms_modern = name_picker(
+        "Prénoms modernes", "prenoms_modern",
+        ['EMMA', 'LÉO', 'LOUISE', 'MILA', 'NOAH', 'MAËL']
+    )
 
 # -------------------- Préparation des données --------------------
-df = df[df['dpt'].isin(dpts)].copy()
-df['type'] = 'AUTRE'
-df.loc[df['preusuel'].isin(prenoms_trad), 'type'] = 'TRADITIONNEL'
-df.loc[df['preusuel'].isin(prenoms_modern), 'type'] = 'MODERNE'
+# Clé de cache indépendante de l'ordre de sélection
+if tous:
+    merged1, merged2 = aggregate_eras(tuple(sorted(dpts)))
+else:
+    merged1, merged2 = aggregate(
+        tuple(sorted(dpts)), tuple(sorted(prenoms_trad)),
+        tuple(sorted(prenoms_modern)))
 
 # -------------------- Graphe 1 : Proportion relative parmi prénoms sélectionnés --------------------
-df1 = df[df['type'].isin(['TRADITIONNEL', 'MODERNE'])]
-
-totals1 = df1.groupby(['annais', 'dpt'])[
-    'nombre'].sum().reset_index(name='total')
-type_sums1 = df1.groupby(['annais', 'dpt', 'type'])[
-    'nombre'].sum().reset_index(name='count')
-merged1 = pd.merge(type_sums1, totals1, on=['annais', 'dpt'])
-merged1['ratio'] = merged1['count'] / merged1['total']
-
 color_scale = alt.Scale(scheme='dark2')
 
 chart1 = alt.Chart(merged1).mark_line(point=True).encode(
@@ -89,16 +145,6 @@ chart1 = alt.Chart(merged1).mark_line(point=True).encode(
 st.altair_chart(chart1, use_container_width=True)
 
 # -------------------- Graphe 2 : Proportion par rapport au total des naissances --------------------
-df2 = df[df['type'].isin(['TRADITIONNEL', 'MODERNE'])]
-
-# Total absolu : toutes les naissances du département et année (pas seulement sélectionnées)
-total_all = df.groupby(['annais', 'dpt'])[
-    'nombre'].sum().reset_index(name='total_all')
-type_sums2 = df2.groupby(['annais', 'dpt', 'type'])[
-    'nombre'].sum().reset_index(name='count')
-merged2 = pd.merge(type_sums2, total_all, on=['annais', 'dpt'])
-merged2['ratio'] = merged2['count'] / merged2['total_all']
-
 chart2 = alt.Chart(merged2).mark_line(point=True).encode(
     x=alt.X('annais:Q', title='Année'),
     y=alt.Y('ratio:Q', title='Part des naissances (absolue)',
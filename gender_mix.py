@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# INDEX DES PRÉNOMS MIXTES
+# ============================================================================
+#
+# Construit une fois à partir de la table (prénom, années, sexe) du cube :
+# totaux M/F par prénom en tableaux indexés par le code du prénom, et pour
+# les prénoms donnés aux deux sexes, matrices M et F (prénom × année). Les
+# requêtes « prénoms mixtes avec au moins N naissances par sexe » et les
+# séries de log-ratio M/F sont de simples sélections dans ces tableaux.
+
+
+class GenderMixIndex:
+    """Totaux et séries annuelles M/F des prénoms (colonnes de script.py)"""
+
+    def __init__(self, nom_annee_sexe):
+        self.yearly_counts = nom_annee_sexe
+        prenoms = nom_annee_sexe['prénom']
+        if not isinstance(prenoms.dtype, pd.CategoricalDtype):
+            prenoms = prenoms.astype('category')
+        self.prenoms = prenoms.cat.categories
+        codes = prenoms.cat.codes.to_numpy()
+        feminin = (nom_annee_sexe['sexe'] == 'F').to_numpy()
+        nombre = nom_annee_sexe['nombre'].to_numpy()
+
+        # Totaux par prénom (indice = code de la catégorie)
+        n = len(self.prenoms)
+        self.m = np.bincount(codes[~feminin], nombre[~feminin], minlength=n)
+        self.f = np.bincount(codes[feminin], nombre[feminin], minlength=n)
+        self.m, self.f = self.m.astype(np.int64), self.f.astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.ratio = self.m / (self.m + self.f)
+
+        # Matrices (prénom mixte × année) des naissances M et F
+        self.codes_mixtes = np.flatnonzero((self.m > 0) & (self.f > 0))
+        position = np.full(n, -1)
+        position[self.codes_mixtes] = np.arange(len(self.codes_mixtes))
+        annees = nom_annee_sexe['années'].to_numpy()
+        self.annees = np.unique(annees)
+
+        ligne = position[codes]
+        garde = ligne >= 0
+        cellule = (feminin[garde] * len(self.codes_mixtes) + ligne[garde]) * \
+            len(self.annees) + np.searchsorted(self.annees, annees[garde])
+        self.serie_m, self.serie_f = np.bincount(
+            cellule, nombre[garde],
+            minlength=2 * len(self.codes_mixtes) * len(self.annees)
+        ).astype(np.int64).reshape(2, len(self.codes_mixtes), len(self.annees))
+
+    def mixed(self, min_per_sex=1, limit=None):
+        """Prénoms avec au moins `min_per_sex` naissances pour chaque sexe
+
+        Dans l'ordre alphabétique, limités aux `limit` premiers.
+        """
+        codes = np.flatnonzero((self.m >= min_per_sex) & (self.f >= min_per_sex))
+        return self.prenoms[codes[:limit]].tolist()
+
+    def yearly(self, names):
+        """Lignes (prénom, années, sexe, nombre) des prénoms demandés"""
+        counts = self.yearly_counts
+        return counts[counts['prénom'].isin(names)]
+
+    def log_ratio_series(self, names):
+        """Log10((M+1)/(F+1)) par prénom mixte et par année où il est donné"""
+        codes = self.prenoms.get_indexer(names)
+        lignes = np.searchsorted(self.codes_mixtes, codes)
+        valides = (codes >= 0) & (lignes < len(self.codes_mixtes))
+        valides[valides] = self.codes_mixtes[lignes[valides]] == codes[valides]
+        lignes = np.sort(lignes[valides])  # ordre des catégories
+
+        m = self.serie_m[lignes]
+        f = self.serie_f[lignes]
+        i, j = np.nonzero(m + f)
+        return pd.DataFrame({
+            'prénom': pd.Categorical.from_codes(self.codes_mixtes[lignes][i],
+                                                self.prenoms),
+            'années': self.annees[j],
+            'M': m[i, j],
+            'F': f[i, j],
+            'ratio_mf': np.log10((m[i, j] + 1) / (f[i, j] + 1)),
+            'total': m[i, j] + f[i, j],
+        })
@@ -0,0 +1,239 @@
+"""Géométrie des départements : GeoJSON -> TopoJSON simplifié, mis en cache
+
+    python geometry.py departements.geojson --level medium
+
+Les contours sont quantifiés sur une grille entière, découpés en arcs
+partagés entre départements voisins (chaque frontière n'est stockée
+qu'une fois), simplifiés par Douglas-Peucker arc par arc (les voisins
+restent jointifs) puis encodés en deltas. Le résultat est écrit une fois
+par niveau de tolérance dans le cache, sous un nom qui contient l'empreinte
+du GeoJSON source ; toutes les cartes référencent ensuite ce même fichier.
+"""
+import argparse
+import json
+import os
+import shutil
+
+import altair as alt
+import numpy as np
+
+from data_loader import _file_hash
+
+DEFAULT_GEOJSON = 'departements.geojson'
+OBJECT_NAME = 'departements'
+
+# Tolérance de simplification, en unités des coordonnées (degrés WGS84)
+TOLERANCES = {'full': 0.0, 'high': 0.001, 'medium': 0.005, 'low': 0.02}
+
+
+def _polygones(geometrie):
+    """Liste de polygones (listes d'anneaux) d'une géométrie GeoJSON"""
+    if geometrie['type'] == 'Polygon':
+        return [geometrie['coordinates']]
+    if geometrie['type'] == 'MultiPolygon':
+        return geometrie['coordinates']
+    raise ValueError(f"Géométrie non surfacique : {geometrie['type']}")
+
+
+def _douglas_peucker(points, tolerance):
+    """Indices des points gardés (extrémités toujours gardées)"""
+    n = len(points)
+    garde = np.zeros(n, dtype=bool)
+    garde[[0, n - 1]] = True
+    ferme = np.array_equal(points[0], points[-1])
+    pile = [(0, n - 1)]
+    while pile:
+        debut, fin = pile.pop()
+        if fin - debut < 2:
+            continue
+        a, ab = points[debut], points[fin] - points[debut]
+        milieu = points[debut + 1:fin] - a
+        longueur = np.hypot(*ab)
+        if longueur == 0:  # arc fermé : distance au point de départ
+            distance = np.hypot(milieu[:, 0], milieu[:, 1])
+        else:
+            distance = np.abs(ab[0] * milieu[:, 1] - ab[1] * milieu[:, 0]) / longueur
+        i = int(np.argmax(distance))
+        # Un anneau fermé garde au moins 4 points (3 sommets distincts)
+        if distance[i] > tolerance or (ferme and garde.sum() < 4):
+            k = debut + 1 + i
+            garde[k] = True
+            pile += [(debut, k), (k, fin)]
+    return np.flatnonzero(garde)
+
+
+class _Arcs:
+    """Arcs uniques (un arc et son inverse ne sont stockés qu'une fois)"""
+
+    def __init__(self):
+        self.arcs = []
+        self._index = {}
+
+    def ajouter(self, arc):
+        cle = arc.tobytes()
+        if cle in self._index:
+            return self._index[cle]
+        inverse = arc[::-1].tobytes()
+        if inverse in self._index:
+            return ~self._index[inverse]
+        self._index[cle] = len(self.arcs)
+        self.arcs.append(arc)
+        return len(self.arcs) - 1
+
+
+def to_topojson(geojson, tolerance=0.0, quantization=100_000,
+                properties=('code', 'nom')):
+    """TopoJSON (dict) d'une FeatureCollection de polygones
+
+    `properties` : propriétés gardées pour chaque département (None = toutes).
+    """
+    features = geojson['features']
+    polygones = [[[np.asarray(anneau, dtype=float)[:, :2] for anneau in poly]
+                  for poly in _polygones(f['geometry'])] for f in features]
+    tous = np.concatenate([a for p in polygones for poly in p for a in poly])
+    origine = tous.min(axis=0)
+    echelle = np.maximum(tous.max(axis=0) - origine, 1e-12) / (quantization - 1)
+
+    # Anneaux quantifiés, sans points consécutifs dupliqués
+    anneaux, emplacements = [], []
+    for i, polys in enumerate(polygones):
+        for j, poly in enumerate(polys):
+            for anneau in poly:
+                q = np.round((anneau - origine) / echelle).astype(np.int64)
+                q = q[np.r_[True, np.any(q[1:] != q[:-1], axis=1)]]
+                if not np.array_equal(q[0], q[-1]):
+                    q = np.vstack([q, q[:1]])
+                if len(q) >= 4:
+                    anneaux.append(q)
+                    emplacements.append((i, j))
+
+    # Propriétaires de chaque côté : (plus petit anneau, plus grand, nombre)
+    n_cotes = np.array([len(a) - 1 for a in anneaux])
+    anneau_du_cote = np.repeat(np.arange(len(anneaux)), n_cotes)
+    point = np.concatenate([a[:, 0] * quantization + a[:, 1] for a in anneaux])
+    fins = np.cumsum(n_cotes + 1)
+    debut_cote = np.delete(np.arange(len(point)), fins - 1)
+    cotes = np.sort(np.column_stack([point[debut_cote], point[debut_cote + 1]]),
+                    axis=1)
+    _, cote = np.unique(cotes, axis=0, return_inverse=True)
+    cote = cote.ravel()
+    premier = np.full(cote.max() + 1, len(anneaux))
+    dernier = np.full(cote.max() + 1, -1)
+    np.minimum.at(premier, cote, anneau_du_cote)
+    np.maximum.at(dernier, cote, anneau_du_cote)
+    signature = (premier[cote] * (len(anneaux) + 1) + dernier[cote]) * 4 + \
+        np.minimum(np.bincount(cote)[cote], 3)
+
+    # Découpage aux jonctions (changement de propriétaires d'un côté au suivant)
+    arcs = _Arcs()
+    geometries = [[[] for _ in polys] for polys in polygones]
+    for k, (anneau, (i, j)) in enumerate(zip(anneaux, emplacements)):
+        sig = signature[fins[k] - len(anneau) - k:fins[k] - 1 - k]
+        jonctions = np.flatnonzero(sig != np.roll(sig, 1))
+        if len(jonctions) == 0:
+            geometries[i][j].append([arcs.ajouter(anneau)])
+            continue
+        ouvert = np.roll(anneau[:-1], -jonctions[0], axis=0)
+        ouvert = np.vstack([ouvert, ouvert[:1]])
+        coupes = np.r_[jonctions - jonctions[0], len(anneau) - 1]
+        geometries[i][j].append([arcs.ajouter(ouvert[d:f + 1])
+                                 for d, f in zip(coupes[:-1], coupes[1:])])
+
+    # Simplification arc par arc puis encodage en deltas
+    encodes = []
+    for arc in arcs.arcs:
+        if tolerance > 0:
+            arc = arc[_douglas_peucker(arc * echelle, tolerance)]
+        encodes.append(np.vstack([arc[:1], np.diff(arc, axis=0)]).tolist())
+
+    objets = []
+    for f, geo in zip(features, geometries):
+        geo = [poly for poly in geo if poly]
+        props = f.get('properties') or {}
+        if properties is not None:
+            props = {k: props[k] for k in properties if k in props}
+        objets.append({
+            'type': 'Polygon' if len(geo) == 1 else 'MultiPolygon',
+            'arcs': geo[0] if len(geo) == 1 else geo,
+            'properties': props,
+        })
+
+    return {
+        'type': 'Topology',
+        'bbox': [*origine.tolist(), *tous.max(axis=0).tolist()],
+        'transform': {'scale': echelle.tolist(), 'translate': origine.tolist()},
+        'objects': {OBJECT_NAME: {'type': 'GeometryCollection',
+                                  'geometries': objets}},
+        'arcs': encodes,
+    }
+
+
+def default_geometry_dir(geojson_path):
+    """Répertoire de cache des géométries, à côté du GeoJSON"""
+    return os.path.join(os.path.dirname(os.path.abspath(geojson_path)),
+                        '.cache_prenoms', 'geometry')
+
+
+def topojson_path(geojson_path=DEFAULT_GEOJSON, level='medium', cache_dir=None):
+    """Chemin du TopoJSON en cache pour ce GeoJSON et ce niveau (créé si besoin)"""
+    if level not in TOLERANCES:
+        raise ValueError(f"Niveau inconnu {level!r} : {sorted(TOLERANCES)}")
+    cache_dir = cache_dir or default_geometry_dir(geojson_path)
+    stem = os.path.splitext(os.path.basename(geojson_path))[0]
+    chemin = os.path.join(
+        cache_dir, f'{stem}.{_file_hash(geojson_path)[:16]}.{level}.topo.json')
+    if not os.path.exists(chemin):
+        with open(geojson_path, encoding='utf-8') as f:
+            topo = to_topojson(json.load(f), TOLERANCES[level])
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f'{chemin}.tmp-{os.getpid()}'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(topo, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp, chemin)
+    return chemin
+
+
+def shared_geometry(geojson_path=DEFAULT_GEOJSON, level='medium', out_dir=None):
+    """URL de la géométrie partagée par toutes les cartes
+
+    Avec `out_dir` (export HTML), le TopoJSON y est copié et l'URL est son
+    nom de fichier ; sinon, le chemin du cache relatif au répertoire courant.
+    """
+    chemin = topojson_path(geojson_path, level)
+    if out_dir is None:
+        return os.path.relpath(chemin).replace(os.sep, '/')
+    nom = f'{OBJECT_NAME}.{level}.topo.json'
+    cible = os.path.join(out_dir, nom)
+    # Même nom pour toutes les sources : une copie de même taille peut venir
+    # d'un autre GeoJSON, d'où la comparaison des contenus
+    if not os.path.exists(cible) or \
+            os.path.getsize(cible) != os.path.getsize(chemin) or \
+            _file_hash(cible) != _file_hash(chemin):
+        shutil.copyfile(chemin, cible)
+    return nom
+
+
+def geo_data(url, inline=False):
+    """Source Altair des départements (TopoJSON ou GeoJSON selon l'extension)
+
+    `inline` : le fichier local est intégré à la spécification (HTML
+    autonome) au lieu d'être référencé par son URL.
+    """
+    source = {'url': url}
+    if inline:
+        with open(url, encoding='utf-8') as f:
+            source = {'values': json.load(f)}
+    if url.endswith(('.topo.json', '.topojson')):
+        return alt.Data(**source, format=alt.DataFormat(type='topojson',
+                                                        feature=OBJECT_NAME))
+    return alt.Data(**source, format={'type': 'json', 'property': 'features'})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('geojson', nargs='?', default=DEFAULT_GEOJSON)
+    parser.add_argument('--level', default='medium', choices=list(TOLERANCES))
+    args = parser.parse_args()
+    chemin = topojson_path(args.geojson, args.level)
+    print(f"{chemin} ({os.path.getsize(chemin) / 1e3:.0f} Ko, source "
+          f"{os.path.getsize(args.geojson) / 1e3:.0f} Ko)")
@@ -0,0 +1,323 @@
+"""Ajout incrémental des publications INSEE annuelles au cache
+
+    python ingest.py dpt2021.csv dpt2022.csv --csv dpt2020.csv --check
+
+Chaque publication (même schéma sexe;preusuel;annais;dpt;nombre) remplace
+dans le cache les années qu'elle contient : années nouvelles ou révisées.
+Elle est notée dans meta.json et rejouée si le cache est reconstruit.
+
+Les agrégats de script.py sont gardés dans le cache (aggregates.npz) et
+mis à jour sans relire les autres années : naissances par (prénom, années,
+sexe) de prepare_temporal_data, par (dpt, années) et (dpt, prénom, sexe)
+de prepare_regional_data, totaux (prénom, sexe) des prénoms mixtes de
+prepare_gender_data. Seules les années de la publication et les lignes des
+prénoms qui y figurent sont recalculées. `--check` compare le cache et ses
+agrégats à une reconstruction complète.
+
+    from script import analyze_prenoms
+    analyze_prenoms(load_cube('dpt2020.csv'))
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_loader import (COLONNES, DEFAULT_CSV, _file_hash, _read_meta,
+                         _source_stat, apply_release, build_cache,
+                         data_version, ensure_cache, read_array,
+                         read_categories, read_columns, read_csv,
+                         release_version, write_cache)
+from dataset import SEXES, clean_data
+from lazy import SCRIPT_COLUMNS
+from rollup import RollupCube
+
+AGGREGATES_FILE = 'aggregates.npz'
+
+# Tables indexées par année : une publication remplace leurs lignes
+TABLES_ANNUELLES = {
+    'nom_annee_sexe': ['prénom', 'années', 'sexe'],
+    'dpt_annee': ['dpt', 'années'],
+}
+# Tables cumulées sur des années : corrigées prénom par prénom
+TABLES_CUMULEES = {
+    'nom_sexe': ['prénom', 'sexe'],
+}
+# Périodes de la table (dpt, prénom, sexe) ; None = toute la période
+YEAR_RANGES = (None, (2010, 2020))
+
+
+def _nom_periode(periode):
+    return 'all' if not periode else f'{periode[0]}-{periode[1]}'
+
+
+def _periode(nom):
+    return None if nom == 'all' else tuple(map(int, nom.split('-')))
+
+
+def _colonnes_script(df):
+    """Lignes du cache avec les colonnes et les types de script.py"""
+    df = df.copy(deep=False)
+    df.columns = [SCRIPT_COLUMNS.get(c, c) for c in df.columns]
+    return clean_data(df).df
+
+
+def _normaliser(table, cles):
+    """Table triée par clés, catégories triées, sans zéros
+
+    Même forme que l'agrégat soit calculé en entier ou mis à jour.
+    """
+    table = table[table['nombre'] != 0]
+    data = {}
+    for col in cles:
+        s = table[col]
+        if col == 'sexe':
+            s = s.astype(str).astype(pd.CategoricalDtype(SEXES))
+        elif col in ('prénom', 'dpt'):
+            s = s.astype('category').cat.remove_unused_categories()
+            if not s.cat.categories.is_monotonic_increasing:
+                s = s.cat.reorder_categories(sorted(s.cat.categories))
+        data[col] = s
+    data['nombre'] = table['nombre'].astype(np.int64)
+    return pd.DataFrame(data).sort_values(cles).reset_index(drop=True)
+
+
+def _table(df, cles):
+    """Naissances sommées par `cles`"""
+    return _normaliser(
+        df.groupby(cles, observed=True)['nombre'].sum().reset_index(), cles)
+
+
+def _concat(parties, cles):
+    """Concatène des tables dont les catégories diffèrent"""
+    data = {}
+    for col in cles + ['nombre']:
+        if col in ('prénom', 'dpt', 'sexe'):
+            data[col] = union_categoricals(
+                [pd.Categorical(p[col]) for p in parties], sort_categories=True)
+        else:
+            data[col] = np.concatenate([p[col].to_numpy() for p in parties])
+    return pd.DataFrame(data)
+
+
+def _tables_de(df, year_ranges):
+    """Définitions (nom, clés, lignes concernées) des agrégats"""
+    for nom, cles in {**TABLES_ANNUELLES, **TABLES_CUMULEES}.items():
+        yield nom, cles, df
+    for periode in year_ranges:
+        sous_df = df if periode is None else \
+            df[df['années'].between(periode[0], periode[1])]
+        yield f'nom_dpt_sexe.{_nom_periode(periode)}', \
+            ['dpt', 'prénom', 'sexe'], sous_df
+
+
+def compute_aggregates(df, year_ranges=YEAR_RANGES):
+    """Agrégats complets des lignes du cache `df` (schéma de load_prenoms)"""
+    df = _colonnes_script(df)
+    return {nom: _table(sous_df, cles)
+            for nom, cles, sous_df in _tables_de(df, year_ranges)}
+
+
+def update_aggregates(tables, removed, added):
+    """Agrégats après le remplacement des lignes `removed` par `added`
+
+    Tables annuelles : lignes des années concernées remplacées. Tables
+    cumulées : seules les lignes des prénoms présents dans `removed` ou
+    `added` sont recalculées (ancien total - retiré + ajouté).
+    """
+    annees = np.unique(np.r_[removed['annais'], added['annais']])
+    removed, added = _colonnes_script(removed), _colonnes_script(added)
+    noms = set(removed['prénom'].astype(str)) | set(added['prénom'].astype(str))
+    periodes = [_periode(nom.split('.', 1)[1]) for nom in tables
+                if nom.startswith('nom_dpt_sexe.')]
+
+    moins = {nom: (cles, d) for nom, cles, d in _tables_de(removed, periodes)}
+    plus = {nom: d for nom, _, d in _tables_de(added, periodes)}
+    resultat = {}
+    for nom, table in tables.items():
+        cles, retirees = moins[nom]
+        if nom in TABLES_ANNUELLES:
+            garde = ~table['années'].isin(annees)
+            parties = [table[garde], _table(plus[nom], cles)]
+        else:
+            touchees = table['prénom'].isin(noms)
+            negatif = retirees.assign(
+                nombre=-retirees['nombre'].astype(np.int64))
+            recalcul = _concat([table[touchees], plus[nom], negatif], cles)
+            parties = [table[~touchees], _table(recalcul, cles)]
+        resultat[nom] = _normaliser(_concat(parties, cles), cles)
+    return resultat
+
+
+# ----- Agrégats persistés ----------------------------------------------------
+
+def save_aggregates(tables, path, version=None):
+    """Écrit les agrégats (npz : codes et catégories des colonnes textuelles)"""
+    tableaux = {'version': np.asarray(version or '')}
+    for nom, table in tables.items():
+        tableaux[f'{nom}/columns'] = np.asarray(table.columns, dtype=str)
+        for col in table.columns:
+            s = table[col]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                tableaux[f'{nom}/{col}.codes'] = s.cat.codes.to_numpy()
+                tableaux[f'{nom}/{col}.categories'] = np.asarray(
+                    s.cat.categories, dtype=str)
+            else:
+                tableaux[f'{nom}/{col}'] = s.to_numpy()
+    tmp = f'{path}.tmp-{os.getpid()}.npz'
+    np.savez(tmp, **tableaux)
+    os.replace(tmp, path)
+
+
+def read_aggregates(path):
+    """(tables, version) lues depuis un fichier écrit par save_aggregates"""
+    with np.load(path) as f:
+        tables = {}
+        for nom in sorted({k.split('/')[0] for k in f.files if '/' in k}):
+            data = {}
+            for col in f[f'{nom}/columns']:
+                if f'{nom}/{col}.codes' in f.files:
+                    data[col] = pd.Categorical.from_codes(
+                        f[f'{nom}/{col}.codes'], f[f'{nom}/{col}.categories'])
+                else:
+                    data[col] = f[f'{nom}/{col}']
+            tables[nom] = pd.DataFrame(data)
+        return tables, str(f['version'])
+
+
+def load_aggregates(csv_path=DEFAULT_CSV, cache_dir=None,
+                    year_ranges=YEAR_RANGES):
+    """Agrégats du cache, calculés puis écrits s'ils manquent ou sont périmés"""
+    cache_dir = ensure_cache(csv_path, cache_dir)
+    version = data_version(cache_dir)
+    chemin = os.path.join(cache_dir, AGGREGATES_FILE)
+    voulues = {f'nom_dpt_sexe.{_nom_periode(p)}' for p in year_ranges}
+    try:
+        tables, version_tables = read_aggregates(chemin)
+        if version_tables == version and voulues <= set(tables):
+            return tables
+    except (OSError, KeyError, ValueError):
+        pass
+    tables = compute_aggregates(read_columns(cache_dir), year_ranges)
+    save_aggregates(tables, chemin, version)
+    return tables
+
+
+def load_cube(csv_path=DEFAULT_CSV, cache_dir=None, year_ranges=YEAR_RANGES):
+    """RollupCube bâti sur les agrégats du cache, sans relire les lignes"""
+    tables = load_aggregates(csv_path, cache_dir, year_ranges)
+    cube = RollupCube.from_tables(
+        tables['nom_annee_sexe'], tables['dpt_annee'],
+        {tuple(p) if p else None: tables[f'nom_dpt_sexe.{_nom_periode(p)}']
+         for p in year_ranges})
+    cube.nom_sexe = tables['nom_sexe']
+    return cube
+
+
+# ----- Ingestion et vérification ---------------------------------------------
+
+def ingest(release_path, csv_path=DEFAULT_CSV, cache_dir=None):
+    """Ajoute une publication au cache de `csv_path` et met à jour les agrégats
+
+    Renvoie un résumé (années, lignes retirées et ajoutées, prénoms
+    concernés). Une publication déjà ajoutée (même contenu) est ignorée.
+    """
+    cache_dir = ensure_cache(csv_path, cache_dir)
+    meta = _read_meta(cache_dir)
+    stat = _source_stat(release_path)
+    sha1 = _file_hash(release_path)
+    if any(r['sha1'] == sha1 for r in meta['releases']):
+        return {'release': release_path, 'skipped': True}
+
+    tables = load_aggregates(csv_path, cache_dir)
+    df = read_columns(cache_dir)
+    release = read_csv(release_path)
+    annees = np.unique(release['annais'])
+    retirees = df[np.isin(df['annais'].to_numpy(), annees)]
+    tables = update_aggregates(tables, retirees, release)
+    df, offsets = apply_release(df, release)
+
+    version = release_version(meta['version'], sha1)
+    releases = meta['releases'] + [{'path': os.path.abspath(release_path),
+                                    'sha1': sha1, **stat,
+                                    'years': [int(a) for a in annees]}]
+    write_cache(df, offsets, cache_dir,
+                {'version': version, 'source': meta['source'],
+                 'releases': releases},
+                extra=lambda d: save_aggregates(
+                    tables, os.path.join(d, AGGREGATES_FILE), version))
+    return {
+        'release': release_path,
+        'years': [int(annees[0]), int(annees[-1])],
+        'rows_removed': len(retirees),
+        'rows_added': len(release),
+        'names': len(set(retirees['preusuel'].astype(str)) |
+                     set(release['preusuel'])),
+    }
+
+
+def check(csv_path=DEFAULT_CSV, cache_dir=None):
+    """Écarts entre le cache (et ses agrégats) et une reconstruction complète
+
+    Le CSV de base et toutes les publications sont relus dans un
+    répertoire temporaire ; une liste vide signifie que tout concorde.
+    """
+    cache_dir = ensure_cache(csv_path, cache_dir)
+    meta = _read_meta(cache_dir)
+    ecarts = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ref = build_cache(csv_path, os.path.join(tmp, 'cache'),
+                          releases=meta['releases'])
+        meta_ref = _read_meta(ref)
+        for cle in ('rows', 'dpt_offsets', 'version'):
+            if meta[cle] != meta_ref[cle]:
+                ecarts.append(f"meta.json : '{cle}' différent")
+        for col in COLONNES:
+            if not np.array_equal(read_array(cache_dir, col), read_array(ref, col)):
+                ecarts.append(f"colonne '{col}' différente")
+            if col in ('preusuel', 'dpt') and \
+                    read_categories(cache_dir, col) != read_categories(ref, col):
+                ecarts.append(f"catégories de '{col}' différentes")
+
+        try:
+            tables, version = read_aggregates(
+                os.path.join(cache_dir, AGGREGATES_FILE))
+        except OSError:
+            return ecarts  # recalculés depuis les données au prochain chargement
+        if version != meta['version']:
+            ecarts.append("agrégats d'une autre version des données")
+        periodes = [_periode(nom.split('.', 1)[1]) for nom in tables
+                    if nom.startswith('nom_dpt_sexe.')]
+        attendues = compute_aggregates(read_columns(ref), periodes)
+        for nom, attendue in attendues.items():
+            try:
+                pd.testing.assert_frame_equal(tables[nom], attendue)
+            except (KeyError, AssertionError):
+                ecarts.append(f"agrégat '{nom}' différent")
+    return ecarts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('releases', nargs='*',
+                        help="publications à ajouter, dans l'ordre")
+    parser.add_argument('--csv', default=DEFAULT_CSV, help="CSV de base")
+    parser.add_argument('--check', action='store_true',
+                        help="compare à une reconstruction complète")
+    args = parser.parse_args()
+
+    for chemin in args.releases:
+        resume = ingest(chemin, args.csv)
+        if resume.get('skipped'):
+            print(f"{chemin} : déjà ajoutée")
+        else:
+            print(f"{chemin} : années {resume['years'][0]}-{resume['years'][1]}, "
+                  f"-{resume['rows_removed']:,} +{resume['rows_added']:,} lignes, "
+                  f"{resume['names']:,} prénoms mis à jour")
+    if args.check:
+        ecarts = check(args.csv)
+        print('\n'.join(ecarts) if ecarts else "Cache cohérent avec une "
+              "reconstruction complète")
+        raise SystemExit(1 if ecarts else 0)
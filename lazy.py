@@ -0,0 +1,199 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (DEFAULT_CSV, _read_meta, ensure_cache, read_array,
+                         read_categories)
+
+# ============================================================================
+# REQUÊTES DIFFÉRÉES SUR LE CACHE COLONNAIRE
+# ============================================================================
+#
+# Une requête décrit filtres, colonnes, renommage et agrégation sans rien
+# lire ; collect() les exécute sur le cache de data_loader. Le cache étant
+# trié par (dpt, annais) avec les bornes de chaque département dans
+# meta.json, les filtres dpt et annais deviennent des tranches de lignes :
+# seules ces tranches des fichiers mmap sont lues. Les filtres preusuel et
+# sexe s'appliquent ensuite sur les codes entiers, avant toute construction
+# de DataFrame.
+#
+#     # load_data (colonnes de script.py), deux départements seulement
+#     scan_prenoms().filter(dpt=['75', '85']).rename(SCRIPT_COLUMNS).collect()
+#
+#     # agrégat (prénom, années, sexe) de prepare_temporal_data
+#     scan_prenoms().group_sum(['preusuel', 'annais', 'sexe']).collect()
+#
+#     # naissances (dpt, prénom, sexe) de prepare_regional_data
+#     scan_prenoms().filter(annais=(2010, 2020)).group_sum(
+#         ['dpt', 'preusuel', 'sexe']).collect()
+#
+#     # carte des prénoms dominants : une seule année lue
+#     DominantIndex(scan_prenoms().filter(annais=(2020, 2020)).collect())
+
+SCRIPT_COLUMNS = {'preusuel': 'prénom', 'annais': 'années'}
+_COLONNES = ['sexe', 'preusuel', 'annais', 'dpt', 'nombre']
+
+
+def _intersection(actuel, nouveau):
+    if actuel is None:
+        return nouveau
+    nouveau = set(nouveau)
+    return [v for v in actuel if v in nouveau]
+
+
+def _fusionner(tranches):
+    """Fusionne les tranches contiguës (une lecture complète = une vue)"""
+    fusion = []
+    for d, f in tranches:
+        if fusion and fusion[-1][1] == d:
+            fusion[-1][1] = f
+        elif f > d:
+            fusion.append([d, f])
+    return [(d, f) for d, f in fusion]
+
+
+class LazyPrenoms:
+    """Requête différée sur le cache d'un CSV INSEE (schéma de load_prenoms)"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._dpts = None        # liste de codes département
+        self._annees = None      # (début, fin) inclus
+        self._prenoms = None     # liste de prénoms
+        self._sexes = None       # liste de valeurs 1/2
+        self._colonnes = list(_COLONNES)
+        self._renommage = {}
+        self._cles = None        # clés de group_sum
+        self._valeur = 'nombre'
+        self._sortie = None      # colonnes gardées après group_sum
+
+    def _copie(self, **attributs):
+        requete = copy.copy(self)
+        requete.__dict__.update(attributs)
+        return requete
+
+    # ----- Construction de la requête -------------------------------------
+
+    def filter(self, dpt=None, annais=None, preusuel=None, sexe=None):
+        """Restreint aux départements, années (début, fin), prénoms, sexes"""
+        requete = self._copie()
+        if dpt is not None:
+            requete._dpts = _intersection(self._dpts, [str(d) for d in dpt])
+        if annais is not None:
+            debut, fin = annais
+            if self._annees:
+                debut, fin = max(debut, self._annees[0]), min(fin, self._annees[1])
+            requete._annees = (debut, fin)
+        if preusuel is not None:
+            requete._prenoms = _intersection(self._prenoms, list(preusuel))
+        if sexe is not None:
+            sexe = [sexe] if np.isscalar(sexe) else list(sexe)
+            requete._sexes = _intersection(self._sexes, sexe)
+        return requete
+
+    def select(self, *columns):
+        """Ne garde que ces colonnes (noms du cache)
+
+        Après group_sum, les colonnes sont choisies parmi ses clés et la
+        valeur sommée, qui restent lues.
+        """
+        if self._cles is None:
+            return self._copie(_colonnes=list(columns))
+        resultat = self._cles + [self._valeur]
+        absentes = [c for c in columns if c not in resultat]
+        if absentes:
+            raise ValueError(f"Colonnes {absentes} absentes du résultat de "
+                             f"group_sum {resultat}")
+        return self._copie(_sortie=list(columns))
+
+    def rename(self, mapping):
+        """Renomme les colonnes du résultat (ex. SCRIPT_COLUMNS)"""
+        return self._copie(_renommage={**self._renommage, **mapping})
+
+    def group_sum(self, keys, value='nombre'):
+        """Somme de `value` par `keys` (groupby observé, trié par clés)"""
+        return self._copie(_cles=list(keys), _valeur=value,
+                           _colonnes=list(keys) + [value], _sortie=None)
+
+    # ----- Exécution ------------------------------------------------------
+
+    def _tranches(self):
+        """Tranches [début, fin) de lignes à lire, dans l'ordre du cache"""
+        offsets = _read_meta(self.cache_dir)['dpt_offsets']
+        dpts = offsets if self._dpts is None else \
+            [d for d in self._dpts if d in offsets]
+        tranches = sorted(tuple(offsets[d]) for d in dpts)
+        if self._annees is not None:
+            # Années triées à l'intérieur de chaque département
+            annais = read_array(self.cache_dir, 'annais')
+            tranches = [(d + np.searchsorted(annais[d:f], self._annees[0], 'left'),
+                         d + np.searchsorted(annais[d:f], self._annees[1], 'right'))
+                        for d, f in tranches]
+        return _fusionner((int(d), int(f)) for d, f in tranches)
+
+    def explain(self):
+        """Plan de lecture : tranches, lignes lues et colonnes
+
+        Seule la colonne annais est consultée (bornes d'un filtre d'années).
+        """
+        tranches = self._tranches()
+        return {
+            'slices': len(tranches),
+            'rows_scanned': sum(f - d for d, f in tranches),
+            'rows_total': _read_meta(self.cache_dir)['rows'],
+            'columns': self._a_lire(),
+            'filters': {'dpt': self._dpts, 'annais': self._annees,
+                        'preusuel': self._prenoms, 'sexe': self._sexes},
+            'group_by': self._cles,
+        }
+
+    def _a_lire(self):
+        filtres = (['preusuel'] if self._prenoms is not None else []) + \
+            (['sexe'] if self._sexes is not None else [])
+        return list(dict.fromkeys(self._colonnes + filtres))
+
+    def _lire(self, col, tranches):
+        """Colonne restreinte aux tranches (vue mmap s'il n'y en a qu'une)"""
+        tableau = read_array(self.cache_dir, col)
+        if len(tranches) == 1:
+            return tableau[tranches[0][0]:tranches[0][1]]
+        if not tranches:
+            return tableau[:0]
+        return np.concatenate([tableau[d:f] for d, f in tranches])
+
+    def collect(self):
+        """Exécute la requête et renvoie un DataFrame"""
+        tranches = self._tranches()
+        tableaux = {col: self._lire(col, tranches) for col in self._a_lire()}
+        categories = {col: read_categories(self.cache_dir, col)
+                      for col in ('preusuel', 'dpt') if col in tableaux}
+
+        garde = None
+        if self._prenoms is not None:
+            voulus = pd.Index(categories['preusuel']).get_indexer(self._prenoms)
+            garde = np.isin(tableaux['preusuel'], voulus[voulus >= 0])
+        if self._sexes is not None:
+            masque = np.isin(tableaux['sexe'], self._sexes)
+            garde = masque if garde is None else garde & masque
+
+        data = {}
+        for col in self._colonnes:
+            valeurs = tableaux[col] if garde is None else tableaux[col][garde]
+            data[col] = pd.Categorical.from_codes(valeurs, categories[col]) \
+                if col in categories else valeurs
+        df = pd.DataFrame(data, copy=False)
+
+        if self._cles is not None:
+            df = df.groupby(self._cles, observed=True)[
+                self._valeur].sum().reset_index()
+            if self._sortie is not None:
+                df = df[self._sortie]
+        # Renommage en place : rename() copierait les colonnes mmap
+        df.columns = [self._renommage.get(c, c) for c in df.columns]
+        return df
+
+
+def scan_prenoms(csv_path=DEFAULT_CSV, cache_dir=None, rebuild=False):
+    """Requête différée sur `csv_path` (le cache est construit si besoin)"""
+    return LazyPrenoms(ensure_cache(csv_path, cache_dir, rebuild))
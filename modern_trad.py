@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# AGRÉGATS « MODERNE vs TRADITIONNEL » PAR DÉPARTEMENT (eti_viz1_app.py)
+# ============================================================================
+#
+# La table (dpt, annais, preusuel) est précalculée une fois et triée par
+# département : une sélection ne lit que les tranches des départements
+# choisis, et le type de chaque prénom se déduit de son code de catégorie.
+
+TYPES = np.array(['AUTRE', 'TRADITIONNEL', 'MODERNE'])
+
+
+class DptTable:
+    """Naissances par (dpt, annais, preusuel), découpées par département"""
+
+    def __init__(self, df):
+        table = df.groupby(['dpt', 'annais', 'preusuel'], observed=True)[
+            'nombre'].sum().reset_index()
+        self.prenoms = table['preusuel'].cat.categories
+        self.codes = table['preusuel'].cat.codes.to_numpy()
+        self.annais = table['annais'].to_numpy()
+        self.nombre = table['nombre'].to_numpy()
+
+        # Bornes [début, fin) de chaque département dans la table triée
+        dpts = table['dpt'].astype(str).to_numpy()
+        debuts = np.flatnonzero(np.r_[True, dpts[1:] != dpts[:-1]])
+        fins = np.r_[debuts[1:], len(dpts)]
+        self.tranches = {dpts[d]: (d, f) for d, f in zip(debuts, fins)}
+
+        # Total de toutes les naissances par (annais, dpt)
+        self.totaux = df.groupby(['annais', 'dpt'], observed=True)[
+            'nombre'].sum().reset_index(name='total_all')
+        self.totaux['dpt'] = self.totaux['dpt'].astype(str)
+
+    @property
+    def dpts(self):
+        return sorted(self.tranches)
+
+    def type_codes(self, prenoms_trad, prenoms_modern):
+        """Code de type (indice dans TYPES) pour chaque catégorie de prénom"""
+        codes = np.zeros(len(self.prenoms), dtype=np.int8)
+        # Un prénom présent dans les deux listes est compté comme moderne
+        for code, prenoms in ((1, prenoms_trad), (2, prenoms_modern)):
+            idx = self.prenoms.get_indexer(list(prenoms))
+            codes[idx[idx >= 0]] = code
+        return codes
+
+    def selection(self, dpts, prenoms_trad, prenoms_modern):
+        """Lignes typées (TRADITIONNEL/MODERNE) des départements choisis"""
+        return self.typed_selection(
+            dpts, self.type_codes(prenoms_trad, prenoms_modern))
+
+    def typed_selection(self, dpts, types):
+        """Comme selection, avec un code de type par catégorie de prénom
+
+        `types` : par exemple name_eras.NameEras.type_codes(self.prenoms).
+        """
+        morceaux = []
+        for dpt in dpts:
+            if dpt not in self.tranches:
+                continue
+            debut, fin = self.tranches[dpt]
+            t = types[self.codes[debut:fin]]
+            garde = np.flatnonzero(t) + debut
+            morceaux.append(pd.DataFrame({
+                'annais': self.annais[garde],
+                'dpt': dpt,
+                'type': TYPES[types[self.codes[garde]]],
+                'nombre': self.nombre[garde],
+            }))
+        if not morceaux:
+            return pd.DataFrame({'annais': pd.Series(dtype=self.annais.dtype),
+                                 'dpt': pd.Series(dtype=str),
+                                 'type': pd.Series(dtype=str),
+                                 'nombre': pd.Series(dtype=self.nombre.dtype)})
+        return pd.concat(morceaux, ignore_index=True)
+
+
+def aggregate_selection(table, dpts, prenoms_trad, prenoms_modern):
+    """Données des graphes 1 et 2 de eti_viz1_app.py : (merged1, merged2)"""
+    return aggregate_types(
+        table, dpts, table.type_codes(prenoms_trad, prenoms_modern))
+
+
+def aggregate_types(table, dpts, types):
+    """Comme aggregate_selection, avec les codes de type de tous les prénoms"""
+    lignes = table.typed_selection(dpts, types)
+
+    type_sums = lignes.groupby(['annais', 'dpt', 'type'])[
+        'nombre'].sum().reset_index(name='count')
+
+    # Graphe 1 : part parmi les prénoms sélectionnés
+    totals1 = lignes.groupby(['annais', 'dpt'])[
+        'nombre'].sum().reset_index(name='total')
+    merged1 = pd.merge(type_sums, totals1, on=['annais', 'dpt'])
+    merged1['ratio'] = merged1['count'] / merged1['total']
+
+    # Graphe 2 : part dans toutes les naissances du département
+    total_all = table.totaux[table.totaux['dpt'].isin(dpts)]
+    merged2 = pd.merge(type_sums, total_all, on=['annais', 'dpt'])
+    merged2['ratio'] = merged2['count'] / merged2['total_all']
+
+    return merged1, merged2
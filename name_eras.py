@@ -0,0 +1,167 @@
+"""Époque de chaque prénom (traditionnel, moderne) déduite des données
+
+    python name_eras.py --csv dpt2020.csv -n 15
+
+Pour chaque prénom, à partir de sa série annuelle de naissances : année du
+pic (en part des naissances de l'année), année de naissance médiane, part
+des naissances pondérée par leur récence (demi-vie en années) et pente de
+croissance relative de sa part sur les dernières années. Le classement
+TRADITIONNEL / MODERNE / AUTRE reprend les codes de modern_trad.TYPES :
+la table est un tableau indexé par code de prénom, joint aux lignes par
+leur code de catégorie plutôt que par appartenance à des listes.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DEFAULT_CSV, data_version, default_cache_dir, load_prenoms
+from modern_trad import TYPES
+
+ERAS_FILE = 'name_eras.npz'
+# Époques (année de naissance médiane) : bornes de début des suivantes
+ERA_BOUNDS = (1945, 1975, 1995)
+ERAS = np.array(['avant 1945', '1945-1974', '1975-1994', 'depuis 1995'])
+FEATURES = ['total', 'peak_year', 'median_year', 'recent_share', 'growth']
+
+
+def name_features(counts, annees, half_life=10, window=20):
+    """Caractéristiques de chaque ligne de `counts` (prénom × année)
+
+    `recent_share` : somme des naissances pondérées par 0.5 ** (âge /
+    `half_life`) sur le total (1 si toutes sont de la dernière année).
+    `growth` : pente de la part annuelle sur les `window` dernières
+    années, divisée par la part moyenne (variation relative par an).
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    totaux = counts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        part = np.nan_to_num(counts / counts.sum(axis=0))
+        cumul = np.cumsum(counts, axis=1)
+        median = np.argmax(cumul >= totaux[:, None] / 2, axis=1)
+        poids = 0.5 ** ((annees[-1] - annees) / half_life)
+        recence = np.nan_to_num(counts @ poids / totaux)
+
+        x = annees[-window:] - annees[-window:].mean()
+        recent = part[:, -window:]
+        pente = recent @ x / (x @ x)
+        croissance = np.nan_to_num(pente / recent.mean(axis=1))
+    return {
+        'total': totaux.astype(np.int64),
+        'peak_year': annees[np.argmax(part, axis=1)].astype(np.int16),
+        'median_year': annees[median].astype(np.int16),
+        'recent_share': recence,
+        'growth': croissance,
+    }
+
+
+class NameEras:
+    """Caractéristiques et classement de tous les prénoms (par code)"""
+
+    def __init__(self, names, features, traditional_before=1960,
+                 modern_from=1990, revival_share=0.5, min_total=100):
+        self.names = pd.Index(np.asarray(names, dtype=str))
+        self.features = {k: np.asarray(features[k]) for k in FEATURES}
+        median = self.features['median_year']
+        self.eras = np.searchsorted(ERA_BOUNDS, median, 'right').astype(np.int8)
+
+        # Retour en grâce : surtout donné récemment et encore en croissance
+        retour = (self.features['recent_share'] >= revival_share) & \
+            (self.features['growth'] > 0)
+        types = np.zeros(len(self.names), dtype=np.int8)
+        types[median < traditional_before] = 1
+        types[(median >= modern_from) | retour] = 2
+        types[self.features['total'] < min_total] = 0
+        self.types = types
+
+    @classmethod
+    def from_frame(cls, df, **params):
+        """Classement des prénoms de `df` (preusuel, annais, nombre)"""
+        prenoms = df['preusuel'].astype('category').cat
+        annais = df['annais'].to_numpy()
+        annees = np.arange(int(annais.min()), int(annais.max()) + 1)
+        counts = np.bincount(
+            prenoms.codes.to_numpy().astype(np.int64) * len(annees) +
+            (annais - annees[0]), df['nombre'].to_numpy(),
+            minlength=len(prenoms.categories) * len(annees)
+        ).reshape(len(prenoms.categories), len(annees))
+        return cls(prenoms.categories,
+                   name_features(counts, annees), **params)
+
+    def __len__(self):
+        return len(self.names)
+
+    def type_codes(self, names):
+        """Code de type (indice dans TYPES) de chaque prénom de `names`
+
+        Aligné sur `names` (par ex. les catégories d'une table), pour une
+        jointure par code ; 0 (AUTRE) pour un prénom inconnu.
+        """
+        codes = self.names.get_indexer(list(names))
+        return np.where(codes >= 0, self.types[codes], 0).astype(np.int8)
+
+    def label(self, prenoms):
+        """Type de chaque ligne d'une colonne catégorielle de prénoms"""
+        prenoms = prenoms.astype('category').cat
+        codes = self.type_codes(prenoms.categories)[prenoms.codes.to_numpy()]
+        return pd.Categorical.from_codes(codes, TYPES)
+
+    def table(self):
+        """Une ligne par prénom : caractéristiques, époque et type"""
+        return pd.DataFrame({
+            'prénom': self.names,
+            **self.features,
+            'era': pd.Categorical.from_codes(self.eras, ERAS),
+            'type': pd.Categorical.from_codes(self.types, TYPES),
+        })
+
+    def save(self, path, source=None):
+        """Écrit les caractéristiques (npz) ; `source` identifie les données"""
+        tmp = f'{path}.tmp-{os.getpid()}.npz'
+        np.savez(tmp, names=np.asarray(self.names, dtype=str),
+                 source=np.asarray(source or ''), **self.features)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, **params):
+        """(classement, source) lus depuis un fichier écrit par save"""
+        with np.load(path) as f:
+            return cls(f['names'], {k: f[k] for k in FEATURES},
+                       **params), str(f['source'])
+
+
+def load_name_eras(csv_path=DEFAULT_CSV, cache_dir=None, **params):
+    """Classement des prénoms du CSV, lu depuis le cache ou recalculé
+
+    Seules les caractéristiques sont gardées : les seuils de `params`
+    s'appliquent au chargement.
+    """
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    df = load_prenoms(csv_path, cache_dir,
+                      columns=['preusuel', 'annais', 'nombre'])
+    source = data_version(cache_dir)
+    chemin = os.path.join(cache_dir, ERAS_FILE)
+    try:
+        eras, source_eras = NameEras.load(chemin, **params)
+        if source_eras == source:
+            return eras
+    except (OSError, KeyError, ValueError):
+        pass
+    eras = NameEras.from_frame(df, **params)
+    eras.save(chemin, source)
+    return eras
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('-n', type=int, default=15,
+                        help="prénoms les plus donnés affichés par type")
+    args = parser.parse_args()
+
+    table = load_name_eras(args.csv).table()
+    print(table['type'].value_counts().to_string())
+    for nom, groupe in table.groupby('type', observed=True):
+        print(f"\n{nom}")
+        print(groupe.nlargest(args.n, 'total').to_string(index=False))
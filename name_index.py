@@ -0,0 +1,131 @@
+import difflib
+import os
+import unicodedata
+
+import numpy as np
+
+from data_loader import DEFAULT_CSV, data_version, default_cache_dir, load_prenoms
+
+# ============================================================================
+# INDEX DE RECHERCHE DES PRÉNOMS
+# ============================================================================
+#
+# Les prénoms sont réduits à une clé sans accents ni casse (« Léo » -> « LEO »)
+# et triés par clé : une recherche par préfixe est un intervalle trouvé par
+# deux searchsorted, puis classé par naissances. La recherche approchée
+# (difflib) ne parcourt que les clés de même initiale. L'index est écrit à
+# côté du cache colonnaire et reconstruit quand la source change.
+
+INDEX_FILE = 'name_index.npz'
+_LIGATURES = str.maketrans({'Œ': 'OE', 'Æ': 'AE', 'ß': 'SS'})
+
+
+def normalize(nom):
+    """Clé de recherche : majuscules, sans accents ni ligatures"""
+    nom = unicodedata.normalize('NFKD', nom.upper().translate(_LIGATURES))
+    return ''.join(c for c in nom if not unicodedata.combining(c)).strip()
+
+
+class NameIndex:
+    """Recherche de prénoms par préfixe ou approchée, classée par naissances"""
+
+    def __init__(self, names, totals, keys=None):
+        self.names = np.asarray(names, dtype=str)
+        self.totals = np.asarray(totals, dtype=np.int64)
+        if keys is None:
+            keys = [normalize(n) for n in self.names]
+        keys = np.asarray(keys, dtype=str)
+        # Trié par clé, à clé égale par naissances décroissantes
+        self.ordre = np.lexsort((-self.totals, keys))
+        self.keys = keys[self.ordre]
+        self.populaires = np.argsort(-self.totals, kind='stable')
+
+    @classmethod
+    def from_frame(cls, df, name_col='preusuel', value_col='nombre'):
+        """Index des prénoms (catégories) de `df`, avec leurs naissances"""
+        prenoms = df[name_col].astype('category').cat
+        totals = np.bincount(prenoms.codes.to_numpy(),
+                             df[value_col].to_numpy(),
+                             minlength=len(prenoms.categories))
+        return cls(prenoms.categories.astype(str), totals)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _classer(self, positions, limit):
+        """Prénoms aux positions données, les plus donnés d'abord"""
+        positions = positions[np.argsort(-self.totals[positions],
+                                         kind='stable')]
+        return self.names[positions[:limit]].tolist()
+
+    def prefix(self, query, limit=20):
+        """Prénoms dont la clé commence par celle de `query`"""
+        cle = normalize(query)
+        debut = np.searchsorted(self.keys, cle, 'left')
+        fin = np.searchsorted(self.keys, cle + '\uffff', 'left')
+        return self._classer(self.ordre[debut:fin], limit)
+
+    def fuzzy(self, query, limit=20, cutoff=0.75):
+        """Prénoms proches de `query` (même initiale, ratio difflib >= cutoff)"""
+        cle = normalize(query)
+        if not cle:
+            return []
+        debut = np.searchsorted(self.keys, cle[0], 'left')
+        fin = np.searchsorted(self.keys, cle[0] + '\uffff', 'left')
+        candidats = np.unique(self.keys[debut:fin])
+        # Un ratio >= cutoff borne l'écart de longueur entre les deux clés
+        ecart = np.abs(np.char.str_len(candidats) - len(cle))
+        candidats = candidats[ecart <= 2 * len(cle) * (1 - cutoff) / cutoff]
+        proches = difflib.get_close_matches(cle, candidats.tolist(),
+                                            n=limit, cutoff=cutoff)
+        positions = [self.ordre[np.searchsorted(self.keys, p, 'left'):
+                                np.searchsorted(self.keys, p, 'right')]
+                     for p in proches]
+        if not positions:
+            return []
+        return self._classer(np.concatenate(positions), limit)
+
+    def search(self, query, limit=20):
+        """Préfixe d'abord, complété par la recherche approchée
+
+        Sans requête, les `limit` prénoms les plus donnés.
+        """
+        if not normalize(query):
+            return self.names[self.populaires[:limit]].tolist()
+        resultats = self.prefix(query, limit)
+        if len(resultats) < limit:
+            deja = set(resultats)
+            resultats += [n for n in self.fuzzy(query, limit)
+                          if n not in deja][:limit - len(resultats)]
+        return resultats
+
+    def save(self, path, source=None):
+        """Écrit l'index (npz) ; `source` identifie les données d'origine"""
+        tmp = f'{path}.tmp-{os.getpid()}.npz'
+        rang = np.argsort(self.ordre)
+        np.savez(tmp, names=self.names, totals=self.totals,
+                 keys=self.keys[rang], source=np.asarray(source or ''))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """(index, source) lus depuis un fichier écrit par save"""
+        with np.load(path) as f:
+            return cls(f['names'], f['totals'], f['keys']), str(f['source'])
+
+
+def load_name_index(csv_path=DEFAULT_CSV, cache_dir=None):
+    """Index des prénoms du CSV, lu depuis le cache ou reconstruit"""
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    df = load_prenoms(csv_path, cache_dir, columns=['preusuel', 'nombre'])
+    source = data_version(cache_dir)
+    chemin = os.path.join(cache_dir, INDEX_FILE)
+    try:
+        index, source_index = NameIndex.load(chemin)
+        if source_index == source:
+            return index
+    except (OSError, KeyError, ValueError):
+        pass
+    index = NameIndex.from_frame(df)
+    index.save(chemin, source)
+    return index
@@ -0,0 +1,112 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# AGRÉGATION PARALLÈLE PAR DÉPARTEMENT (OU PAR ANNÉE)
+# ============================================================================
+#
+# Les colonnes utiles sont copiées une fois en mémoire partagée, triées par
+# la colonne de partition (dpt ou année) : chaque processus lit sa tranche
+# contiguë sans copie ni sérialisation, agrège sur les codes entiers des
+# catégories et renvoie un petit résultat. Quand la colonne de partition
+# fait partie des clés, les résultats partiels sont disjoints et il suffit
+# de les concaténer.
+
+
+def _codes(col):
+    """Tableau d'entiers d'une colonne (codes si catégorielle)"""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy()
+    return col.to_numpy()
+
+
+def _attacher(blocs):
+    """Ouvre les blocs de mémoire partagée et renvoie (shm, tableaux)"""
+    shms, tableaux = [], {}
+    for col, (nom, dtype, n) in blocs.items():
+        shm = shared_memory.SharedMemory(name=nom)
+        shms.append(shm)
+        tableaux[col] = np.ndarray(n, dtype=dtype, buffer=shm.buf)
+    return shms, tableaux
+
+
+def _agreger_tranche(blocs, debut, fin, cles, valeur, filtre):
+    """Exécuté dans un processus : groupby-sum d'une tranche partagée"""
+    shms, tableaux = _attacher(blocs)
+    try:
+        df = pd.DataFrame({col: t[debut:fin] for col, t in tableaux.items()})
+        if filtre is not None:
+            col, bas, haut = filtre
+            df = df[(df[col] >= bas) & (df[col] <= haut)]
+        return df.groupby(cles, sort=False)[valeur].sum().reset_index()
+    finally:
+        del tableaux
+        for shm in shms:
+            shm.close()
+
+
+def _tranches(partition, n_morceaux):
+    """Bornes de tranches de tailles proches, coupées entre deux partitions"""
+    coupures = np.flatnonzero(partition[1:] != partition[:-1]) + 1
+    cibles = np.linspace(0, len(partition), n_morceaux + 1)[1:-1]
+    choisies = np.unique(coupures[np.minimum(
+        np.searchsorted(coupures, cibles), len(coupures) - 1)]) \
+        if len(coupures) else np.array([], dtype=int)
+    bornes = np.r_[0, choisies, len(partition)]
+    return list(zip(bornes[:-1], bornes[1:]))
+
+
+def parallel_groupby_sum(df, keys, partition='dpt', value='nombre',
+                         n_jobs=None, year_range=None, year_col=None):
+    """Équivalent de df.groupby(keys, observed=True)[value].sum().reset_index()
+
+    Les données sont réparties par `partition` entre `n_jobs` processus
+    (tous les cœurs par défaut). `year_range` filtre `year_col` avant
+    l'agrégation (colonne 'années' ou 'annais' détectée sinon).
+    """
+    n_jobs = n_jobs or os.cpu_count()
+    if year_range and year_col is None:
+        year_col = 'années' if 'années' in df.columns else 'annais'
+    colonnes = list(dict.fromkeys(keys + [partition, value] +
+                                  ([year_col] if year_range else [])))
+
+    # Copie en mémoire partagée, triée par la colonne de partition
+    cle_partition = _codes(df[partition])
+    ordre = np.argsort(cle_partition, kind='stable')
+    blocs, shms = {}, []
+    try:
+        for col in colonnes:
+            valeurs = _codes(df[col])
+            shm = shared_memory.SharedMemory(create=True,
+                                             size=max(valeurs.nbytes, 1))
+            shms.append(shm)
+            np.take(valeurs, ordre,
+                    out=np.ndarray(len(valeurs), valeurs.dtype, buffer=shm.buf))
+            blocs[col] = (shm.name, valeurs.dtype, len(valeurs))
+
+        filtre = (year_col, year_range[0], year_range[1]) if year_range else None
+        tranches = _tranches(cle_partition[ordre], n_jobs * 4)
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            partiels = list(pool.map(
+                _agreger_tranche, *zip(*[
+                    (blocs, d, f, keys, value, filtre) for d, f in tranches])))
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    resultat = pd.concat(partiels, ignore_index=True)
+    if partition not in keys:
+        resultat = resultat.groupby(keys, sort=False)[value].sum().reset_index()
+    resultat = resultat.sort_values(keys, ignore_index=True)
+
+    # Codes -> catégories d'origine
+    for col in keys:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            resultat[col] = pd.Categorical.from_codes(
+                resultat[col], dtype=df[col].dtype)
+    return resultat
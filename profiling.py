@@ -0,0 +1,150 @@
+import cProfile
+import contextvars
+import functools
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import pandas as pd
+
+# ============================================================================
+# MESURE DES ÉTAPES DE L'ANALYSE
+# ============================================================================
+#
+# Les fonctions prepare_* / create_* de script.py sont décorées par
+# @profiled : sans enregistreur actif, le décorateur ne fait qu'appeler la
+# fonction. Dans un bloc `with StageRecorder() as rec:`, chaque appel ajoute
+# une ligne (temps réel, temps CPU, hausse du pic RSS, lignes en entrée et
+# en sortie). Les étapes imbriquées (prepare_* appelée par create_*)
+# gardent le nom de leur étape parente.
+
+_ACTIF = contextvars.ContextVar('recorder', default=None)
+
+
+def _pic_rss():
+    """Pic RSS du processus en octets (None si `resource` est absent)"""
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kio sous Linux, octets sous macOS
+    return pic if sys.platform == 'darwin' else pic * 1024
+
+
+def count_rows(obj):
+    """Nombre de lignes des données de `obj` (None si inconnu)
+
+    Accepte un DataFrame, un PrenomsDataset, un RollupCube (lignes de son
+    DataFrame), un graphique Altair (lignes de ses données) ou un tuple de
+    ces objets (somme).
+    """
+    if isinstance(obj, (tuple, list)):
+        lignes = [count_rows(o) for o in obj]
+        return None if not lignes or None in lignes else sum(lignes)
+    if isinstance(obj, (str, bytes, dict)):
+        return None
+    if isinstance(obj, (pd.DataFrame, pd.Series)) or hasattr(obj, '__len__'):
+        return len(obj)
+    for attr in ('data', 'df'):
+        donnees = getattr(obj, attr, None)
+        if isinstance(donnees, pd.DataFrame):
+            return len(donnees)
+    return None
+
+
+class StageRecorder:
+    """Enregistre les étapes exécutées dans un bloc `with`
+
+    Avec `profile`, le bloc entier est aussi profilé par cProfile et les
+    statistiques sont écrites dans ce fichier (format pstats, lisible par
+    `python -m pstats`, snakeviz ou flameprof).
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile
+        self.stages = []
+        self._pile = []
+        self._profiler = None
+        self._jeton = None
+
+    def __enter__(self):
+        self._jeton = _ACTIF.set(self)
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile)
+            self._profiler = None
+        _ACTIF.reset(self._jeton)
+        return False
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Mesure le bloc ; `rows_out` peut être renseigné dans l'entrée"""
+        entree = {'stage': name,
+                  'parent': self._pile[-1]['stage'] if self._pile else None,
+                  'rows_in': rows_in, 'rows_out': None}
+        self._pile.append(entree)
+        rss = _pic_rss()
+        cpu, mur = time.process_time(), time.perf_counter()
+        try:
+            yield entree
+        finally:
+            entree['wall_s'] = time.perf_counter() - mur
+            entree['cpu_s'] = time.process_time() - cpu
+            entree['peak_rss_delta_mb'] = (
+                None if rss is None else (_pic_rss() - rss) / 1e6)
+            self._pile.pop()
+            self.stages.append(entree)
+
+    def report(self):
+        """DataFrame des étapes, dans l'ordre où elles se sont terminées"""
+        return pd.DataFrame(self.stages, columns=[
+            'stage', 'parent', 'wall_s', 'cpu_s', 'peak_rss_delta_mb',
+            'rows_in', 'rows_out'])
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.stages, f, indent=2, ensure_ascii=False)
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Étape mesurée par l'enregistreur actif (bloc nu sinon)"""
+    recorder = _ACTIF.get()
+    if recorder is None:
+        yield {}
+    else:
+        with recorder.stage(name, rows_in) as entree:
+            yield entree
+
+
+def profiled(fonction=None, name=None):
+    """Décorateur : mesure chaque appel comme une étape de l'enregistreur actif
+
+    Les lignes en entrée sont comptées sur le premier argument, celles en
+    sortie sur le résultat (voir count_rows).
+    """
+    if fonction is None:
+        return functools.partial(profiled, name=name)
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        recorder = _ACTIF.get()
+        if recorder is None:
+            return fonction(*args, **kwargs)
+        with recorder.stage(name or fonction.__name__,
+                            count_rows(args[0]) if args else None) as entree:
+            resultat = fonction(*args, **kwargs)
+            entree['rows_out'] = count_rows(resultat)
+        return resultat
+    return enveloppe
@@ -0,0 +1,85 @@
+import json
+import os
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import pandas as pd
+
+# ============================================================================
+# CLIENT DU SERVEUR DE REQUÊTES (query_server.py)
+# ============================================================================
+#
+# Même forme de résultats que les calculs locaux (DataFrames), sans charger
+# les données dans le processus appelant. L'adresse vient de l'argument ou
+# de la variable d'environnement PRENOMS_QUERY_URL.
+
+ENV_URL = 'PRENOMS_QUERY_URL'
+DEFAULT_URL = 'http://127.0.0.1:8765'  # query_server.DEFAULT_PORT
+
+
+class QueryClient:
+    """Accès HTTP aux agrégats servis par query_server.py"""
+
+    def __init__(self, base_url=None, timeout=30):
+        self.base_url = (base_url or os.environ.get(ENV_URL) or
+                         DEFAULT_URL).rstrip('/')
+        self.timeout = timeout
+
+    def get(self, endpoint, **params):
+        """Réponse JSON décodée ; les listes sont jointes par des virgules"""
+        params = {k: ','.join(v) if isinstance(v, (list, tuple)) else v
+                  for k, v in params.items() if v is not None}
+        url = f'{self.base_url}/{endpoint}?{urlencode(params)}'
+        try:
+            with urlopen(url, timeout=self.timeout) as reponse:
+                return json.load(reponse)
+        except HTTPError as e:
+            raise ValueError(json.load(e).get('error', str(e))) from None
+
+    def health(self):
+        return self.get('health')
+
+    def dpts(self):
+        return self.health()['dpts']
+
+    def series(self, names):
+        """Naissances (prénom, annais, sexe, nombre) des prénoms demandés"""
+        data = self.get('series', names=names)
+        annees = data['years']
+        return pd.DataFrame([
+            {'preusuel': nom, 'annais': a, 'sexe': sexe, 'nombre': n}
+            for nom, serie in data['series'].items()
+            for sexe in ('M', 'F')
+            for a, n in zip(annees, serie[sexe]) if n
+        ], columns=['preusuel', 'annais', 'sexe', 'nombre'])
+
+    def dept_shares(self, names, year_range=None):
+        """Naissances et % des naissances de chaque département, par prénom"""
+        debut, fin = year_range or (None, None)
+        data = self.get('dept_shares', names=names, start=debut, end=fin)
+        return pd.DataFrame([
+            {'dpt': dpt, 'preusuel': nom, 'nombre': n, 'pourcentage': p}
+            for nom, parts in data['shares'].items()
+            for dpt, n, p in zip(data['dpts'], parts['nombre'],
+                                 parts['pourcentage'])
+        ], columns=['dpt', 'preusuel', 'nombre', 'pourcentage'])
+
+    def dominant(self, year, k=1):
+        """Comme DominantIndex.dominants(year, k)"""
+        return pd.DataFrame(self.get('dominant', year=year, k=k))
+
+    def mixed(self, min_per_sex=1, limit=None):
+        """Log-ratio M/F annuel des prénoms mixtes (prénom × année)"""
+        data = self.get('mixed', min_per_sex=min_per_sex, limit=limit)
+        return pd.DataFrame(data['ratio_mf'], index=data['names'],
+                            columns=data['years'], dtype=float)
+
+    def modern_trad(self, dpts, prenoms_trad=(), prenoms_modern=(), eras=False):
+        """Comme modern_trad.aggregate_selection : (merged1, merged2)
+
+        `eras` : tous les prénoms, classés par name_eras, au lieu des listes.
+        """
+        data = self.get('modern_trad', dpts=dpts, trad=prenoms_trad,
+                        modern=prenoms_modern, eras=1 if eras else None)
+        return pd.DataFrame(data['merged1']), pd.DataFrame(data['merged2'])
@@ -0,0 +1,267 @@
+"""Serveur local de requêtes sur les données de prénoms (JSON sur HTTP)
+
+    python query_server.py --csv dpt2020.csv --port 8765
+
+Le jeu de données est chargé une fois et les agrégats sont partagés par
+tous les clients (query_client.py, l'application Streamlit avec
+PRENOMS_QUERY_URL, les notebooks). Points d'accès (GET) :
+
+    /health                                   lignes, prénoms, départements
+    /series?names=LÉO,EMMA                    naissances par année et sexe
+    /dept_shares?names=LÉO&start=2010&end=2020  part de chaque département
+    /dominant?year=2020&k=1                   prénom dominant par département
+    /mixed?min_per_sex=100&limit=15           prénoms mixtes et log-ratio M/F
+    /modern_trad?dpts=75,85&trad=JEAN&modern=EMMA  données de eti_viz1_app.py
+    /modern_trad?dpts=75,85&eras=1            idem, tous les prénoms classés
+"""
+import argparse
+import asyncio
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache, wraps
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from data_loader import DEFAULT_CSV, load_prenoms
+from dominants import DominantIndex
+from modern_trad import DptTable, aggregate_selection, aggregate_types
+from name_eras import NameEras, name_features
+from tensor_backend import CountTensor
+
+DEFAULT_PORT = 8765
+
+
+class QueryError(ValueError):
+    """Requête invalide (réponse HTTP 400)"""
+
+
+def _liste(params, cle):
+    return tuple(v for v in params.get(cle, '').split(',') if v)
+
+
+def _entier(params, cle, defaut=None):
+    valeur = params.get(cle)
+    if valeur is None:
+        if defaut is None:
+            raise QueryError(f"Paramètre '{cle}' manquant")
+        return defaut
+    try:
+        return int(valeur)
+    except ValueError:
+        raise QueryError(f"Paramètre '{cle}' non entier : {valeur!r}") from None
+
+
+def _records(df):
+    """Lignes d'un DataFrame en dicts sérialisables (NaN -> null)"""
+    return [{k: (None if isinstance(v, float) and math.isnan(v) else v)
+             for k, v in ligne.items()}
+            for ligne in df.astype(object).to_dict('records')]
+
+
+def _partagee(methode):
+    """cached_property construite une seule fois, même depuis plusieurs threads
+
+    Les requêtes sont traitées dans les threads du serveur : sans verrou,
+    deux requêtes simultanées construiraient chacune la structure.
+    """
+    @wraps(methode)
+    def construire(self):
+        with self._verrou:
+            if methode.__name__ in self.__dict__:
+                return self.__dict__[methode.__name__]
+            return methode(self)
+    return cached_property(construire)
+
+
+class QueryService:
+    """Réponses JSON calculées sur les données chargées une seule fois
+
+    Les structures (tenseur, index des dominants, table par département)
+    sont construites à la première requête qui en a besoin, ou toutes
+    d'avance par warm ; les réponses déjà encodées sont gardées dans un
+    cache LRU.
+    """
+
+    def __init__(self, df, cache_size=1024):
+        self.df = df
+        self.query = lru_cache(maxsize=cache_size)(self._query)
+        # Réentrant : era_types construit tensor et dpt_table
+        self._verrou = threading.RLock()
+
+    @_partagee
+    def tensor(self):
+        return CountTensor(self.df)
+
+    @_partagee
+    def dominant_index(self):
+        return DominantIndex(self.df)
+
+    @_partagee
+    def dpt_table(self):
+        return DptTable(self.df)
+
+    @_partagee
+    def era_types(self):
+        """Type (name_eras) de chaque prénom de la table par département"""
+        t = self.tensor
+        eras = NameEras(t.names, name_features(t.marginal(('prenom', 'annee')),
+                                               t.annees))
+        return eras.type_codes(self.dpt_table.prenoms)
+
+    def warm(self):
+        """Construit toutes les structures avant les premières requêtes"""
+        for nom in ('tensor', 'dominant_index', 'dpt_table', 'era_types'):
+            getattr(self, nom)
+        return self
+
+    def handle(self, path, query_string=''):
+        """(code HTTP, corps JSON en octets) pour une requête GET"""
+        params = {k: v[-1] for k, v in parse_qs(query_string).items()}
+        try:
+            return 200, self.query(path, tuple(sorted(params.items())))
+        except QueryError as e:
+            return 400, json.dumps({'error': str(e)}).encode()
+
+    def _query(self, path, params):
+        params = dict(params)
+        methode = getattr(self, 'q_' + path.strip('/'), None)
+        if methode is None:
+            raise QueryError(f"Point d'accès inconnu : {path}")
+        return json.dumps(methode(params), ensure_ascii=False).encode()
+
+    # ----- Points d'accès -------------------------------------------------
+
+    def q_health(self, params):
+        return {'rows': len(self.df), 'names': len(self.tensor.names),
+                'dpts': self.dpt_table.dpts,
+                'years': [int(self.tensor.annees[0]),
+                          int(self.tensor.annees[-1])]}
+
+    def q_series(self, params):
+        noms = _liste(params, 'names')
+        t = self.tensor
+        serie = t.marginal(('prenom', 'sexe', 'annee'))
+        codes = t.names.get_indexer(list(noms))
+        return {
+            'years': t.annees.tolist(),
+            'series': {nom: {'M': serie[c, 0].tolist(), 'F': serie[c, 1].tolist()}
+                       for nom, c in zip(noms, codes) if c >= 0},
+        }
+
+    def q_dept_shares(self, params):
+        noms = _liste(params, 'names')
+        periode = (_entier(params, 'start', int(self.tensor.annees[0])),
+                   _entier(params, 'end', int(self.tensor.annees[-1])))
+        t = self.tensor
+        cases = t.marginal(('dpt', 'prenom', 'sexe'), periode).sum(axis=2)
+        total = cases.sum(axis=1)
+        codes = t.names.get_indexer(list(noms))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            part = cases / total[:, None] * 100
+        return {
+            'dpts': t.dpts.tolist(),
+            'shares': {nom: {'nombre': cases[:, c].tolist(),
+                             'pourcentage': np.nan_to_num(part[:, c]).tolist()}
+                       for nom, c in zip(noms, codes) if c >= 0},
+        }
+
+    def q_dominant(self, params):
+        k = _entier(params, 'k', 1)
+        try:
+            resultat = self.dominant_index.dominants(_entier(params, 'year'), k)
+        except ValueError as e:
+            raise QueryError(str(e)) from None
+        return _records(resultat)
+
+    def q_mixed(self, params):
+        minimum = _entier(params, 'min_per_sex', 1)
+        limite = _entier(params, 'limit', 0) or None
+        t = self.tensor
+        totaux = t.marginal(('prenom', 'sexe'))
+        codes = np.flatnonzero((totaux >= minimum).all(axis=1))[:limite]
+        noms, ratio = t.mf_ratio(t.names[codes])
+        return {
+            'years': t.annees.tolist(),
+            'male_share': (totaux[codes, 0] / totaux[codes].sum(axis=1)).tolist(),
+            'names': noms,
+            'ratio_mf': [[None if math.isnan(v) else v for v in ligne]
+                         for ligne in ratio.tolist()],
+        }
+
+    def q_modern_trad(self, params):
+        if params.get('eras'):
+            merged1, merged2 = aggregate_types(
+                self.dpt_table, _liste(params, 'dpts'), self.era_types)
+        else:
+            merged1, merged2 = aggregate_selection(
+                self.dpt_table, _liste(params, 'dpts'), _liste(params, 'trad'),
+                _liste(params, 'modern'))
+        return {'merged1': _records(merged1), 'merged2': _records(merged2)}
+
+
+# ----- Serveur HTTP asynchrone ---------------------------------------------
+
+_STATUTS = {200: 'OK', 400: 'Bad Request', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+async def _repondre(service, executor, reader, writer):
+    try:
+        ligne = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass  # en-têtes ignorés
+        try:
+            methode, cible, _ = ligne.decode('latin-1').split(' ', 2)
+        except ValueError:
+            return
+        if methode != 'GET':
+            code, corps = 405, b'{"error": "GET uniquement"}'
+        else:
+            url = urlsplit(cible)
+            try:
+                # Calculs dans un thread : la boucle reste disponible
+                code, corps = await asyncio.get_running_loop().run_in_executor(
+                    executor, service.handle, url.path, url.query)
+            except Exception as e:  # noqa: BLE001 - renvoyé au client
+                code, corps = 500, json.dumps({'error': repr(e)}).encode()
+        writer.write(
+            f'HTTP/1.1 {code} {_STATUTS[code]}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(corps)}\r\n'
+            'Connection: close\r\n\r\n'.encode() + corps)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=DEFAULT_PORT, workers=4):
+    """Sert `service` jusqu'à interruption (structures construites d'avance)"""
+    service.warm()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    serveur = await asyncio.start_server(
+        lambda r, w: _repondre(service, executor, r, w), host, port)
+    print(f"Serveur de requêtes sur http://{host}:{port}")
+    async with serveur:
+        await serveur.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-size', type=int, default=1024)
+    args = parser.parse_args(argv)
+
+    service = QueryService(load_prenoms(args.csv), cache_size=args.cache_size)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Statistiques régionales de tous les prénoms sur une période
+
+    python regional_stats.py --csv dpt2020.csv --years 2010-2020 -n 20
+
+Pour chaque prénom : part moyenne des naissances des départements, écart-
+type et coefficient de variation (mêmes définitions que le graphique de
+variance de script.py), indice de Gini et entropie normalisée de sa
+répartition entre départements. Les tables sont calculées par réductions
+sur le tenseur de comptes (tensor_backend.py) et gardées dans le cache.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DEFAULT_CSV, data_version, default_cache_dir, load_prenoms
+from tensor_backend import CountTensor
+
+COLONNES = ['prénom', 'total', 'mean_pct', 'std_pct', 'cv', 'gini', 'entropy']
+
+
+def _gini(x):
+    """Indice de Gini de chaque ligne de `x` (valeurs positives)"""
+    x = np.sort(x, axis=1)
+    n = x.shape[1]
+    poids = 2 * np.arange(1, n + 1) - n - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (x @ poids) / (n * x.sum(axis=1))
+
+
+def _entropie(x):
+    """Entropie de Shannon de chaque ligne normalisée en distribution, / log(n)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = x / x.sum(axis=1, keepdims=True)
+        h = np.where(p > 0, -p * np.log(p), 0).sum(axis=1)
+    return h / np.log(x.shape[1])
+
+
+def regional_stats(tensor, year_range=None):
+    """Table des statistiques régionales de chaque prénom donné sur la période
+
+    Gini et entropie portent sur le pourcentage des naissances de chaque
+    département (les deux sexes cumulés) : 0 et 1 pour un prénom réparti
+    comme la population, Gini proche de 1 et entropie faible pour un
+    prénom concentré dans quelques départements.
+    """
+    if not isinstance(tensor, CountTensor):
+        tensor = CountTensor(tensor)
+    stats = tensor.regional_variation(None, year_range)
+
+    par_dpt = tensor.marginal(('dpt', 'prenom', 'sexe'), year_range).sum(axis=2)
+    total_dept = par_dpt.sum(axis=1)
+    par_dpt = par_dpt[total_dept > 0]
+    pct = (par_dpt / total_dept[total_dept > 0, None]).T
+    pct = pct[stats['prénom'].cat.codes.to_numpy()]
+    stats['gini'] = _gini(pct)
+    stats['entropy'] = _entropie(pct)
+    return stats[COLONNES]
+
+
+def most_concentrated(stats, n=20, by='gini', min_total=1000):
+    """Les n prénoms les plus concentrés régionalement (Gini ou entropie)
+
+    `min_total` écarte les prénoms trop rares pour que la mesure ait un sens.
+    """
+    stats = stats[stats['total'] >= min_total]
+    if by == 'entropy':
+        return stats.nsmallest(n, 'entropy')
+    return stats.nlargest(n, by)
+
+
+def save_regional_stats(stats, path, source=None):
+    """Écrit la table (npz, une entrée par colonne)"""
+    tmp = f'{path}.tmp-{os.getpid()}.npz'
+    prenoms = stats['prénom'].cat
+    np.savez(tmp, source=np.asarray(source or ''),
+             categories=np.asarray(prenoms.categories, dtype=str),
+             codes=prenoms.codes.to_numpy(),
+             **{col: stats[col].to_numpy() for col in COLONNES[1:]})
+    os.replace(tmp, path)
+
+
+def read_regional_stats(path):
+    """(table, source) lues depuis un fichier écrit par save_regional_stats"""
+    with np.load(path) as f:
+        stats = pd.DataFrame({
+            'prénom': pd.Categorical.from_codes(f['codes'], f['categories']),
+            **{col: f[col] for col in COLONNES[1:]}})
+        return stats, str(f['source'])
+
+
+def load_regional_stats(csv_path=DEFAULT_CSV, year_range=None, cache_dir=None,
+                        tensor=None):
+    """Table de la période, lue depuis le cache ou calculée puis écrite
+
+    `tensor` évite de reconstruire le tenseur quand plusieurs périodes
+    sont demandées à la suite.
+    """
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    df = load_prenoms(csv_path, cache_dir)
+    source = data_version(cache_dir)
+    nom = 'all' if not year_range else f'{year_range[0]}-{year_range[1]}'
+    chemin = os.path.join(cache_dir, f'regional_stats.{nom}.npz')
+    try:
+        stats, source_stats = read_regional_stats(chemin)
+        if source_stats == source:
+            return stats
+    except (OSError, KeyError, ValueError):
+        pass
+    stats = regional_stats(tensor if tensor is not None else CountTensor(df),
+                           year_range)
+    save_regional_stats(stats, chemin, source)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--years', default=None, help="ex. 2010-2020")
+    parser.add_argument('-n', type=int, default=20)
+    parser.add_argument('--by', default='gini',
+                        choices=['gini', 'entropy', 'cv', 'std_pct'])
+    parser.add_argument('--min-total', type=int, default=1000)
+    args = parser.parse_args()
+
+    periode = tuple(map(int, args.years.split('-'))) if args.years else None
+    stats = load_regional_stats(args.csv, periode)
+    print(most_concentrated(stats, args.n, args.by, args.min_total)
+          .to_string(index=False))
@@ -0,0 +1,232 @@
+"""Génère tous les graphiques sans affichage, en parallèle
+
+    python render_reports.py --out rapports --csv dpt2020.csv -j 8 \\
+        --map-years 1900-2020 --formats html,json,png
+
+`--map-years all` produit une seule carte de toutes les années, dont le
+curseur d'année est entièrement géré par le navigateur.
+
+Chaque analyse (script.py, saf_viz3.py, cartes des prénoms dominants) est
+une tâche exécutée dans un pool de processus ; les graphiques sont écrits
+en HTML/JSON, et en PNG/SVG si un moteur de rendu local est installé
+(vl-convert pour Altair, kaleido pour Plotly). Les cartes référencent
+toutes un même TopoJSON simplifié copié dans le répertoire de sortie.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_loader import load_prenoms
+from geometry import DEFAULT_GEOJSON, TOLERANCES, shared_geometry
+
+FORMATS_TEXTE = ('html', 'json')
+FORMATS_IMAGE = ('png', 'svg')
+
+# Données chargées une fois par processus (cache mmap de data_loader)
+_DONNEES = {}
+
+
+def _init_worker(csv_path, geo_url='departements.geojson'):
+    _DONNEES['csv_path'] = csv_path
+    _DONNEES['geo_url'] = geo_url
+
+
+def _donnees():
+    if 'df' not in _DONNEES:
+        _DONNEES['df'] = load_prenoms(_DONNEES['csv_path'])
+    return _DONNEES['df']
+
+
+def _cube():
+    if 'cube' not in _DONNEES:
+        from rollup import RollupCube
+        from script import load_data
+        _DONNEES['cube'] = RollupCube(load_data(_DONNEES['csv_path']))
+    return _DONNEES['cube']
+
+
+def _index_dominants():
+    if 'dominants' not in _DONNEES:
+        from dominants import DominantIndex
+        _DONNEES['dominants'] = DominantIndex(_donnees())
+    return _DONNEES['dominants']
+
+
+# ----- Construction des graphiques (dans les processus du pool) ------------
+
+def _graphiques(tache):
+    """Liste de (nom, graphique) produite par une tâche"""
+    groupe, parametre = tache
+    if groupe == 'script':
+        import script
+        creer = {
+            'temporal': script.create_temporal_visualizations,
+            'regional': script.create_regional_visualizations,
+            'gender': script.create_gender_visualizations,
+        }[parametre]
+        return [(f'{parametre}_{i + 1}', chart)
+                for i, chart in enumerate(creer(_cube()))]
+    if groupe == 'saf':
+        import saf_viz3
+        if parametre == 'pyramid':
+            return [('unisex_pyramid', saf_viz3.unisex_pyramid_chart(_donnees()))]
+        return [('unisex_lines', saf_viz3.unisex_lines_figure(_donnees()))]
+    if groupe == 'carte' and parametre == 'all':
+        from dominants import dominant_map_all_years
+        return [('carte_dominants_all',
+                 dominant_map_all_years(_index_dominants(),
+                                        geo_url=_DONNEES['geo_url']))]
+    if groupe == 'carte':
+        from dominants import dominant_map_chart
+        return [(f'carte_dominants_{parametre}',
+                 dominant_map_chart(_index_dominants(), parametre,
+                                    geo_url=_DONNEES['geo_url']))]
+    raise ValueError(f"Tâche inconnue : {tache}")
+
+
+def _sauver(nom, graphique, out_dir, formats):
+    """Écrit un graphique (Altair ou Plotly) dans les formats disponibles"""
+    fichiers = []
+    plotly = hasattr(graphique, 'write_html')
+    for fmt in formats:
+        chemin = os.path.join(out_dir, f'{nom}.{fmt}')
+        if plotly:
+            if fmt == 'html':
+                graphique.write_html(chemin)
+            elif fmt == 'json':
+                graphique.write_json(chemin)
+            else:
+                graphique.write_image(chemin)
+        else:
+            graphique.save(chemin)
+        fichiers.append(chemin)
+    return fichiers
+
+
+def _executer(tache, out_dir, formats):
+    """Calcule puis écrit les graphiques d'une tâche, avec leurs durées"""
+    debut = time.perf_counter()
+    try:
+        graphiques = _graphiques(tache)
+    except Exception as exc:  # ex. plotly absent : les autres tâches continuent
+        return [{'chart': f'{tache[0]}_{tache[1]}', 'task': f'{tache[0]}:{tache[1]}',
+                 'compute_s': round(time.perf_counter() - debut, 4),
+                 'render_s': 0.0, 'files': [],
+                 'error': f'{type(exc).__name__}: {exc}', 'pid': os.getpid()}]
+    calcul = time.perf_counter() - debut
+
+    resultats = []
+    for nom, graphique in graphiques:
+        debut = time.perf_counter()
+        formats_ok = [f for f in formats if f in FORMATS_TEXTE or
+                      _moteur_image(graphique)]
+        try:
+            fichiers = _sauver(nom, graphique, out_dir, formats_ok)
+            erreur = None
+        except Exception as exc:  # un graphique en échec n'arrête pas le lot
+            fichiers, erreur = [], f'{type(exc).__name__}: {exc}'
+        resultats.append({
+            'chart': nom,
+            'task': f'{tache[0]}:{tache[1]}',
+            'compute_s': round(calcul / len(graphiques), 4),
+            'render_s': round(time.perf_counter() - debut, 4),
+            'files': fichiers,
+            'error': erreur,
+            'pid': os.getpid(),
+        })
+    return resultats
+
+
+def _moteur_image(graphique):
+    """Vrai si un moteur de rendu PNG/SVG local est disponible"""
+    module = 'kaleido' if hasattr(graphique, 'write_image') else 'vl_convert'
+    return importlib.util.find_spec(module) is not None
+
+
+# ----- Ligne de commande ---------------------------------------------------
+
+def _annees(texte):
+    """'2020', '1900-2020', '1950,2000,2020' ou 'all' vers une liste d'années"""
+    annees = []
+    for morceau in texte.split(','):
+        if morceau == 'all':
+            annees.append('all')
+        elif '-' in morceau:
+            debut, fin = map(int, morceau.split('-'))
+            annees.extend(range(debut, fin + 1))
+        elif morceau:
+            annees.append(int(morceau))
+    return annees
+
+
+def taches(map_years):
+    """Toutes les tâches de rendu"""
+    return ([('script', nom) for nom in ('temporal', 'regional', 'gender')] +
+            [('saf', 'pyramid'), ('saf', 'lines')] +
+            [('carte', annee) for annee in map_years])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='dpt2020.csv')
+    parser.add_argument('--out', default='rapports')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--map-years', type=_annees, default=[2020],
+                        help="ex. 2020, 1900-2020, 1950,2000 ou all")
+    parser.add_argument('--formats', default='html,json,png,svg',
+                        help="png/svg ignorés sans moteur de rendu local")
+    parser.add_argument('--only', default=None,
+                        help="groupes à exécuter parmi script,saf,carte")
+    parser.add_argument('--geojson', default=DEFAULT_GEOJSON,
+                        help="contours des départements pour les cartes")
+    parser.add_argument('--geo-level', default='medium', choices=list(TOLERANCES),
+                        help="niveau de simplification du TopoJSON partagé")
+    args = parser.parse_args(argv)
+
+    formats = [f for f in args.formats.split(',') if f]
+    inconnus = set(formats) - set(FORMATS_TEXTE + FORMATS_IMAGE)
+    if inconnus:
+        parser.error(f"formats inconnus : {sorted(inconnus)}")
+    os.makedirs(args.out, exist_ok=True)
+
+    liste = taches(args.map_years)
+    if args.only:
+        groupes = set(args.only.split(','))
+        liste = [t for t in liste if t[0] in groupes]
+
+    # Cache construit avant le lancement des processus (pas de course)
+    load_prenoms(args.csv, columns=['annais'])
+
+    # Une seule géométrie simplifiée, copiée à côté des cartes et référencée
+    # par toutes (sinon le GeoJSON d'origine, par URL)
+    geo_url = args.geojson
+    if os.path.exists(args.geojson) and any(t[0] == 'carte' for t in liste):
+        geo_url = shared_geometry(args.geojson, args.geo_level, out_dir=args.out)
+
+    debut = time.perf_counter()
+    resultats = []
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                             initargs=(args.csv, geo_url)) as pool:
+        futures = [pool.submit(_executer, t, args.out, formats) for t in liste]
+        for future in as_completed(futures):
+            for r in future.result():
+                etat = 'ERREUR ' + r['error'] if r['error'] else \
+                    f"{len(r['files'])} fichier(s)"
+                print(f"{r['chart']:<28} calcul {r['compute_s']:7.2f} s  "
+                      f"rendu {r['render_s']:7.2f} s  {etat}")
+                resultats.append(r)
+    total = time.perf_counter() - debut
+
+    with open(os.path.join(args.out, 'timings.json'), 'w', encoding='utf-8') as f:
+        json.dump({'total_s': round(total, 3), 'jobs': args.jobs,
+                   'charts': sorted(resultats, key=lambda r: r['chart'])},
+                  f, indent=2, ensure_ascii=False)
+    print(f"{len(resultats)} graphiques en {total:.2f} s ({args.jobs} processus)")
+    return 1 if any(r['error'] for r in resultats) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
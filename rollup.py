@@ -0,0 +1,119 @@
+from functools import cached_property
+
+from dataset import clean_data
+from gender_mix import GenderMixIndex
+from parallel import parallel_groupby_sum
+
+# ============================================================================
+# CUBE D'AGRÉGATS (prénom × année × sexe × département)
+# ============================================================================
+#
+# Les fonctions prepare_* / create_* de script.py refaisaient chacune leurs
+# groupby sur le DataFrame complet. Le cube calcule chaque agrégat standard
+# au plus une fois (à la première demande) et dérive les agrégats grossiers
+# des agrégats fins déjà matérialisés plutôt que des données brutes.
+
+
+class RollupCube:
+    """Agrégats standards des données de prénoms (colonnes de script.py)"""
+
+    def __init__(self, data):
+        # `data` : PrenomsDataset, ou DataFrame nettoyé ici une seule fois
+        self.df = clean_data(data).df
+        self._nom_dpt_sexe = {}
+
+    @classmethod
+    def from_tables(cls, nom_annee_sexe, dpt_annee, nom_dpt_sexe):
+        """Cube bâti sur des agrégats déjà calculés, sans données brutes
+
+        `nom_dpt_sexe` associe chaque période disponible (tuple ou None pour
+        toute la période) à sa table (dpt, prénom, sexe).
+        """
+        cube = cls.__new__(cls)
+        cube.df = None
+        cube._nom_dpt_sexe = dict(nom_dpt_sexe)
+        cube.nom_annee_sexe = nom_annee_sexe
+        cube.dpt_annee = dpt_annee
+        return cube
+
+    # ----- Agrégats calculés sur les données brutes -----------------------
+
+    @cached_property
+    def nom_annee_sexe(self):
+        """Naissances par (prénom, années, sexe)"""
+        return self.df.groupby(['prénom', 'années', 'sexe'], observed=True)[
+            'nombre'].sum().reset_index()
+
+    @cached_property
+    def dpt_annee(self):
+        """Naissances par (dpt, années)"""
+        return self.df.groupby(['dpt', 'années'], observed=True)[
+            'nombre'].sum().reset_index()
+
+    def nom_dpt_sexe(self, year_range=None, n_jobs=1):
+        """Naissances par (dpt, prénom, sexe), éventuellement sur une période
+
+        Avec `n_jobs` différent de 1, l'agrégation est répartie par
+        département entre plusieurs processus (None = tous les cœurs).
+        """
+        cle = tuple(year_range) if year_range else None
+        if cle not in self._nom_dpt_sexe:
+            if self.df is None:
+                raise ValueError(
+                    f"Période {cle} non pré-agrégée : disponibles "
+                    f"{sorted(self._nom_dpt_sexe, key=str)}")
+            if n_jobs != 1:
+                self._nom_dpt_sexe[cle] = parallel_groupby_sum(
+                    self.df, ['dpt', 'prénom', 'sexe'], partition='dpt',
+                    n_jobs=n_jobs, year_range=cle, year_col='années')
+                return self._nom_dpt_sexe[cle]
+            df = self.df
+            if cle:
+                df = df[df['années'].between(cle[0], cle[1])]
+            self._nom_dpt_sexe[cle] = df.groupby(
+                ['dpt', 'prénom', 'sexe'], observed=True)[
+                'nombre'].sum().reset_index()
+        return self._nom_dpt_sexe[cle]
+
+    # ----- Agrégats dérivés des précédents --------------------------------
+
+    @cached_property
+    def nom_sexe(self):
+        """Naissances par (prénom, sexe) sur toute la période"""
+        return self.nom_annee_sexe.groupby(['prénom', 'sexe'], observed=True)[
+            'nombre'].sum().reset_index()
+
+    @cached_property
+    def nom_totaux(self):
+        """Naissances par prénom (Series indexée par prénom)"""
+        return self.nom_sexe.groupby('prénom', observed=True)['nombre'].sum()
+
+    @cached_property
+    def gender_mix(self):
+        """Index des prénoms mixtes (totaux et séries annuelles M/F)"""
+        return GenderMixIndex(self.nom_annee_sexe)
+
+    @cached_property
+    def annee_nom(self):
+        """Naissances par (années, prénom), tous sexes confondus"""
+        return self.nom_annee_sexe.groupby(['années', 'prénom'], observed=True)[
+            'nombre'].sum().reset_index()
+
+    def dpt_totaux(self, year_range=None):
+        """Naissances par département, éventuellement sur une période"""
+        data = self.dpt_annee
+        if year_range:
+            data = data[data['années'].between(year_range[0], year_range[1])]
+        return data.groupby('dpt', observed=True)['nombre'].sum().reset_index()
+
+    def top_prenoms(self, n, sexe=None):
+        """Les n prénoms les plus donnés (pour un sexe ou au total)"""
+        if sexe is None:
+            return self.nom_totaux.nlargest(n).index.tolist()
+        totaux = self.nom_sexe[self.nom_sexe['sexe'] == sexe]
+        return totaux.nlargest(n, 'nombre')['prénom'].tolist()
+
+
+def as_cube(data):
+    """Renvoie `data` si c'est déjà un cube, sinon le cube de ce DataFrame"""
+    return data if isinstance(data, RollupCube) else RollupCube(data)
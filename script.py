@@ -1,52 +1,61 @@
 import pandas as pd
 import altair as alt
-import numpy as np
 
-# Configuration d'Altair pour un meilleur rendu
-alt.data_transformers.enable('json')
+from chart_data import ChartDataStore, compact
+from dataset import clean_data
+from lazy import SCRIPT_COLUMNS, scan_prenoms
+from profiling import StageRecorder, count_rows, profiled, stage
+from rollup import RollupCube
+from tensor_backend import CountTensor
 
+BACKENDS = ('cube', 'tensor')
 
-def clean_data(df):
-    """Nettoie et prépare les données"""
-    df_clean = df.copy()
 
-    # Conversion des types
-    df_clean['années'] = pd.to_numeric(df_clean['années'], errors='coerce')
-    df_clean['nombre'] = pd.to_numeric(df_clean['nombre'], errors='coerce')
+@profiled
+def load_data(csv_path='dpt2020.csv', dpts=None, years=None):
+    """Charge dpt2020.csv (via le cache) avec les noms de colonnes du script
 
-    # Suppression des valeurs nulles
-    df_clean = df_clean.dropna(subset=['années', 'nombre'])
+    Avec `dpts` et/ou `years` (début, fin), seules les lignes de ces
+    départements et années sont lues (voir lazy.py).
+    """
+    return scan_prenoms(csv_path).filter(dpt=dpts, annais=years).rename(
+        SCRIPT_COLUMNS).collect()
 
-    # Nettoyage des noms de colonnes si nécessaire
-    df_clean.columns = df_clean.columns.str.strip()
 
-    return df_clean
+def as_backend(data, backend='cube'):
+    """Agrégats de `data` : RollupCube, ou CountTensor si `backend='tensor'`
 
+    Un cube ou un tenseur déjà construit est renvoyé tel quel, et les
+    fonctions ci-dessous suivent le type de ce qu'elles reçoivent.
+    """
+    if isinstance(data, (RollupCube, CountTensor)):
+        return data
+    if backend not in BACKENDS:
+        raise ValueError(f"backend inconnu : {backend!r} (parmi {BACKENDS})")
+    return CountTensor(data) if backend == 'tensor' else RollupCube(data)
 
-# Supposons que votre DataFrame s'appelle 'df'
-df = pd.read_csv('dpt2020.csv', sep=';')
-df.columns = ['sexe', 'prénom', 'années', 'dpt', 'nombre']
 
 # Fonctions de préparation des données
 
 
+@profiled
 def prepare_temporal_data(df, top_n=15):
-    """Prépare les données pour l'analyse temporelle"""
-    # Convertir la colonne années en numérique
-    df_copy = df.copy()
-    df_copy['années'] = pd.to_numeric(df_copy['années'], errors='coerce')
+    """Prépare les données pour l'analyse temporelle
+
+    `df` peut être un DataFrame, un PrenomsDataset (clean_data), un
+    RollupCube ou un CountTensor déjà construit (voir as_backend).
+    """
+    cube = as_backend(df)
+    if isinstance(cube, CountTensor):
+        return cube.yearly_counts(cube.top_names(top_n, sexe='M') +
+                                  cube.top_names(top_n, sexe='F'))
 
     # Agrégation par prénom, année et sexe
-    yearly_counts = df_copy.groupby(['prénom', 'années', 'sexe'])[
-        'nombre'].sum().reset_index()
+    yearly_counts = cube.nom_annee_sexe
 
     # Top prénoms par sexe sur toute la période
-    total_counts = df_copy.groupby(['prénom', 'sexe'])[
-        'nombre'].sum().reset_index()
-    top_prenoms_m = total_counts[total_counts['sexe'] == 'M'].nlargest(top_n, 'nombre')[
-        'prénom'].tolist()
-    top_prenoms_f = total_counts[total_counts['sexe'] == 'F'].nlargest(top_n, 'nombre')[
-        'prénom'].tolist()
+    top_prenoms_m = cube.top_prenoms(top_n, sexe='M')
+    top_prenoms_f = cube.top_prenoms(top_n, sexe='F')
 
     # Filtrer pour les top prénoms
     top_prenoms = top_prenoms_m + top_prenoms_f
@@ -55,23 +64,22 @@ def prepare_temporal_data(df, top_n=15):
     return filtered_data
 
 
-def prepare_regional_data(df, year_range=None):
-    """Prépare les données pour l'analyse régionale"""
-    if year_range:
-        # Convertir la colonne années en numérique si elle ne l'est pas
-        df_copy = df.copy()
-        df_copy['années'] = pd.to_numeric(df_copy['années'], errors='coerce')
-        df_filtered = df_copy[df_copy['années'].between(
-            year_range[0], year_range[1])]
-    else:
-        df_filtered = df
+@profiled
+def prepare_regional_data(df, year_range=None, n_jobs=1):
+    """Prépare les données pour l'analyse régionale
+
+    `n_jobs` > 1 (ou None pour tous les cœurs) répartit l'agrégation par
+    département entre plusieurs processus (sans effet avec un CountTensor).
+    """
+    cube = as_backend(df)
+    if isinstance(cube, CountTensor):
+        return cube.regional_share(year_range)
 
     # Agrégation par département et prénom
-    regional_counts = df_filtered.groupby(['dpt', 'prénom', 'sexe'])[
-        'nombre'].sum().reset_index()
+    regional_counts = cube.nom_dpt_sexe(year_range, n_jobs=n_jobs)
 
     # Calcul des pourcentages par département
-    dept_totals = regional_counts.groupby('dpt')['nombre'].sum().reset_index()
+    dept_totals = cube.dpt_totaux(year_range)
     dept_totals.columns = ['dpt', 'total_dept']
 
     regional_data = regional_counts.merge(dept_totals, on='dpt')
@@ -81,34 +89,31 @@ def prepare_regional_data(df, year_range=None):
     return regional_data
 
 
+@profiled
 def prepare_gender_data(df):
     """Prépare les données pour l'analyse des effets de genre"""
-    # Convertir la colonne années en numérique
-    df_copy = df.copy()
-    df_copy['années'] = pd.to_numeric(df_copy['années'], errors='coerce')
-
-    # Prénoms mixtes (donnés aux deux sexes)
-    prenoms_mixtes = df_copy.groupby('prénom')['sexe'].nunique()
-    prenoms_mixtes = prenoms_mixtes[prenoms_mixtes == 2].index.tolist()
+    cube = as_backend(df)
+    if isinstance(cube, CountTensor):
+        return cube.yearly_counts(cube.mixed())
+    mix = cube.gender_mix
 
-    # Données pour prénoms mixtes
-    mixed_data = df_copy[df_copy['prénom'].isin(prenoms_mixtes)]
-    mixed_yearly = mixed_data.groupby(['prénom', 'années', 'sexe'])[
-        'nombre'].sum().reset_index()
-
-    return mixed_yearly
+    # Données pour prénoms mixtes (donnés aux deux sexes)
+    return mix.yearly(mix.mixed())
 
 # ============================================================================
 # VISUALISATION 1: ÉVOLUTION TEMPORELLE DES PRÉNOMS
 # ============================================================================
 
 
+@profiled
 def create_temporal_visualizations(df):
     """Crée les visualisations temporelles"""
-    temporal_data = prepare_temporal_data(df, top_n=10)
+    cube = as_backend(df)
+    temporal_data = prepare_temporal_data(cube, top_n=10)
 
     # Graphique 1: Évolution des top prénoms par sexe
-    base_temporal = alt.Chart(temporal_data).add_params(
+    base_temporal = alt.Chart(compact(
+        temporal_data, ['prénom', 'années', 'sexe', 'nombre'])).add_params(
         alt.selection_point(fields=['prénom'])
     )
 
@@ -127,17 +132,16 @@ def create_temporal_visualizations(df):
     )
 
     # Graphique 2: Heatmap de popularité
-    # Convertir années en numérique pour la heatmap aussi
-    df_copy = df.copy()
-    df_copy['années'] = pd.to_numeric(df_copy['années'], errors='coerce')
-    heatmap_data = df_copy.groupby(['années', 'prénom'])[
-        'nombre'].sum().reset_index()
-    top_20_prenoms = df_copy.groupby(
-        'prénom')['nombre'].sum().nlargest(20).index.tolist()
-    heatmap_filtered = heatmap_data[heatmap_data['prénom'].isin(
-        top_20_prenoms)]
-
-    heatmap = alt.Chart(heatmap_filtered).mark_rect().encode(
+    if isinstance(cube, CountTensor):
+        heatmap_filtered = cube.year_name(cube.top_names(20))
+    else:
+        heatmap_data = cube.annee_nom
+        top_20_prenoms = cube.top_prenoms(20)
+        heatmap_filtered = heatmap_data[heatmap_data['prénom'].isin(
+            top_20_prenoms)]
+
+    heatmap = alt.Chart(compact(
+        heatmap_filtered, ['années', 'prénom', 'nombre'])).mark_rect().encode(
         x=alt.X('années:O', title='Année'),
         y=alt.Y('prénom:N', title='Prénom', sort='-x'),
         color=alt.Color('nombre:Q', scale=alt.Scale(
@@ -156,19 +160,28 @@ def create_temporal_visualizations(df):
 # ============================================================================
 
 
-def create_regional_visualizations(df):
+@profiled
+def create_regional_visualizations(df, n_jobs=1):
     """Crée les visualisations régionales"""
+    cube = as_backend(df)
+    tenseur = isinstance(cube, CountTensor)
+    periode = (2010, 2020)  # Exemple sur 2010-2020
     regional_data = prepare_regional_data(
-        df, year_range=(2010, 2020))  # Exemple sur 2010-2020
+        cube, year_range=periode, n_jobs=n_jobs)
 
     # Sélection des prénoms populaires pour l'analyse
-    top_prenoms_regional = df.groupby(
-        'prénom')['nombre'].sum().nlargest(10).index.tolist()
+    top_prenoms_regional = cube.top_names(10) if tenseur else \
+        cube.top_prenoms(10)
     regional_filtered = regional_data[regional_data['prénom'].isin(
         top_prenoms_regional)]
 
     # Graphique 1: Carte de chaleur par département
-    regional_heatmap = alt.Chart(regional_filtered).mark_rect().encode(
+    # (une case par département et prénom : les deux sexes sont cumulés)
+    heatmap_data = regional_filtered.groupby(['dpt', 'prénom'], observed=True)[
+        ['pourcentage', 'nombre']].sum().reset_index()
+    heatmap_data = compact(
+        heatmap_data, ['dpt', 'prénom', 'pourcentage', 'nombre'])
+    regional_heatmap = alt.Chart(heatmap_data).mark_rect().encode(
         x=alt.X('dpt:N', title='Département'),
         y=alt.Y('prénom:N', title='Prénom'),
         color=alt.Color('pourcentage:Q', scale=alt.Scale(
@@ -181,14 +194,19 @@ def create_regional_visualizations(df):
     )
 
     # Graphique 2: Variance régionale
-    variance_data = regional_filtered.groupby('prénom').agg({
-        'pourcentage': ['mean', 'std'],
-        'nombre': 'sum'
-    }).reset_index()
-    variance_data.columns = ['prénom', 'mean_pct', 'std_pct', 'total']
-    variance_data['cv'] = variance_data['std_pct'] / \
-        variance_data['mean_pct']  # Coefficient de variation
-
+    if tenseur:
+        variance_data = cube.regional_variation(top_prenoms_regional, periode)
+    else:
+        variance_data = regional_filtered.groupby('prénom', observed=True).agg({
+            'pourcentage': ['mean', 'std'],
+            'nombre': 'sum'
+        }).reset_index()
+        variance_data.columns = ['prénom', 'mean_pct', 'std_pct', 'total']
+        variance_data['cv'] = variance_data['std_pct'] / \
+            variance_data['mean_pct']  # Coefficient de variation
+
+    variance_data = compact(
+        variance_data, ['prénom', 'mean_pct', 'cv', 'total'])
     variance_chart = alt.Chart(variance_data).mark_circle(size=100).encode(
         x=alt.X('mean_pct:Q', title='Popularité moyenne (%)'),
         y=alt.Y('cv:Q', title='Coefficient de variation régionale'),
@@ -208,23 +226,22 @@ def create_regional_visualizations(df):
 # ============================================================================
 
 
+@profiled
 def create_gender_visualizations(df):
-    """Crée les visualisations des effets de genre"""
-    gender_data = prepare_gender_data(df)
+    """Crée les visualisations des effets de genre
 
-    # Sélection des prénoms mixtes avec suffisamment de données pour les deux sexes
-    mixed_stats = gender_data.groupby(['prénom', 'sexe'])[
-        'nombre'].sum().reset_index()
-    mixed_pivot = mixed_stats.pivot(
-        index='prénom', columns='sexe', values='nombre').fillna(0)
+    Avec un CountTensor, le tenseur joue le rôle de l'index des prénoms
+    mixtes (mixed, log_ratio_series à partir de mf_ratio).
+    """
+    cube = as_backend(df)
+    tenseur = isinstance(cube, CountTensor)
+    mix = cube if tenseur else cube.gender_mix
 
-    # Filtrer les prénoms qui ont au moins 100 naissances pour chaque sexe
-    mixed_pivot = mixed_pivot[(mixed_pivot.get('M', 0) >= 100) & (
-        mixed_pivot.get('F', 0) >= 100)]
-    valid_mixed_prenoms = mixed_pivot.index.tolist()[:15]  # Top 15
+    # Prénoms qui ont au moins 100 naissances pour chaque sexe
+    valid_mixed_prenoms = mix.mixed(min_per_sex=100, limit=15)  # Top 15
 
-    gender_filtered = gender_data[gender_data['prénom'].isin(
-        valid_mixed_prenoms)]
+    gender_filtered = cube.yearly_counts(valid_mixed_prenoms) if tenseur \
+        else mix.yearly(valid_mixed_prenoms)
 
     if len(gender_filtered) == 0:
         print("Aucun prénom mixte trouvé avec suffisamment de données")
@@ -237,7 +254,9 @@ def create_gender_visualizations(df):
         return empty_chart, empty_chart
 
     # Graphique 1: Évolution comparative par sexe
-    gender_evolution = alt.Chart(gender_filtered).mark_line(point=True).encode(
+    gender_evolution = alt.Chart(compact(
+        gender_filtered, ['prénom', 'années', 'sexe', 'nombre'])
+    ).mark_line(point=True).encode(
         x=alt.X('années:O', title='Année'),
         y=alt.Y('nombre:Q', title='Nombre de naissances'),
         color=alt.Color('sexe:N', title='Sexe', scale=alt.Scale(
@@ -247,7 +266,8 @@ def create_gender_visualizations(df):
         width=300,
         height=200
     ).facet(
-        facet=alt.Facet('prénom:N', columns=5),
+        facet=alt.Facet('prénom:N'),
+        columns=5,
         title="Évolution des prénoms mixtes par sexe"
     ).resolve_scale(
         y='independent'
@@ -255,30 +275,14 @@ def create_gender_visualizations(df):
 
     # Graphique 2: Ratio M/F dans le temps
     if len(gender_filtered) > 0:
-        pivot_data = gender_filtered.pivot_table(
-            index=['prénom', 'années'],
-            columns='sexe',
-            values='nombre',
-            fill_value=0
-        ).reset_index()
-
-        # Vérifier et créer les colonnes manquantes
-        if 'M' not in pivot_data.columns:
-            pivot_data['M'] = 0
-        if 'F' not in pivot_data.columns:
-            pivot_data['F'] = 0
-
-        # Filtrer pour ne garder que les prénoms qui ont des données pour les deux sexes
-        pivot_data = pivot_data[(pivot_data['M'] > 0) | (pivot_data['F'] > 0)]
-        pivot_data = pivot_data.groupby('prénom').filter(
-            lambda x: (x['M'] > 0).any() and (x['F'] > 0).any())
+        # Séries M/F déjà calculées par l'index (les prénoms retenus ont
+        # des naissances pour les deux sexes)
+        pivot_data = mix.log_ratio_series(valid_mixed_prenoms)
 
         if len(pivot_data) > 0:
-            pivot_data['ratio_mf'] = np.log10(
-                (pivot_data['M'] + 1) / (pivot_data['F'] + 1))  # Log ratio
-            pivot_data['total'] = pivot_data['M'] + pivot_data['F']
-
-            ratio_chart = alt.Chart(pivot_data).mark_line(point=True).encode(
+            ratio_data = compact(
+                pivot_data, ['prénom', 'années', 'ratio_mf', 'total', 'M', 'F'])
+            ratio_chart = alt.Chart(ratio_data).mark_line(point=True).encode(
                 x=alt.X('années:O', title='Année'),
                 y=alt.Y('ratio_mf:Q', title='Log(Ratio M/F)',
                         scale=alt.Scale(domain=[-2, 2])),
@@ -307,20 +311,44 @@ def create_gender_visualizations(df):
 # ============================================================================
 
 
-def analyze_prenoms(df):
-    """Fonction principale d'analyse"""
-    # Nettoyer les données d'abord
+def analyze_prenoms(df, show=True, data_dir=None, n_jobs=1, backend='cube'):
+    """Fonction principale d'analyse
+
+    Les données des graphiques sont incluses en CSV ; avec `data_dir`, elles
+    sont écrites une seule fois dans ce répertoire et référencées par URL.
+    `n_jobs` est transmis à l'analyse régionale (voir prepare_regional_data).
+    `backend='tensor'` calcule tout sur un CountTensor (voir as_backend).
+    """
+    # Nettoyer les données d'abord (une seule fois, sans copie en aval)
+    # `df` peut aussi être un cube déjà agrégé (ex. streaming.stream_cube)
+    # ou un CountTensor
     print("Nettoyage des données...")
-    df_clean = clean_data(df)
+    # Tous les agrégats sont calculés une fois puis partagés
+    with stage('clean_data', count_rows(df)):
+        cube = as_backend(df, backend)
 
     print("Création des visualisations temporelles...")
-    temporal_chart, heatmap = create_temporal_visualizations(df_clean)
+    temporal_chart, heatmap = create_temporal_visualizations(cube)
 
     print("Création des visualisations régionales...")
-    regional_heatmap, variance_chart = create_regional_visualizations(df_clean)
+    regional_heatmap, variance_chart = create_regional_visualizations(
+        cube, n_jobs=n_jobs)
 
     print("Création des visualisations de genre...")
-    gender_evolution, ratio_chart = create_gender_visualizations(df_clean)
+    gender_evolution, ratio_chart = create_gender_visualizations(cube)
+
+    visualizations = {
+        'temporal': (temporal_chart, heatmap),
+        'regional': (regional_heatmap, variance_chart),
+        'gender': (gender_evolution, ratio_chart)
+    }
+    with stage('chart_data'):
+        visualizations = ChartDataStore(data_dir).attach(visualizations)
+    temporal_chart, heatmap = visualizations['temporal']
+    regional_heatmap, variance_chart = visualizations['regional']
+    gender_evolution, ratio_chart = visualizations['gender']
+    if not show:
+        return visualizations
 
     # Affichage des graphiques
     print("\n=== QUESTION 1: ÉVOLUTION TEMPORELLE ===")
@@ -344,25 +372,31 @@ def analyze_prenoms(df):
     print("2. Ratio Masculin/Féminin dans le temps:")
     ratio_chart.show()
 
-    return {
-        'temporal': (temporal_chart, heatmap),
-        'regional': (regional_heatmap, variance_chart),
-        'gender': (gender_evolution, ratio_chart)
-    }
+    return visualizations
+
+
+def analyze_prenoms_profiled(df, profile=None, **kwargs):
+    """analyze_prenoms mesurée étape par étape : (visualizations, rapport)
+
+    Le rapport est un DataFrame (temps réel et CPU, hausse du pic RSS,
+    lignes en entrée et en sortie par étape, voir profiling.py). Avec
+    `profile`, un profil cProfile complet est écrit dans ce fichier.
+    """
+    kwargs.setdefault('show', False)
+    with StageRecorder(profile) as recorder:
+        visualizations = analyze_prenoms(df, **kwargs)
+    return visualizations, recorder.report()
 
 # ============================================================================
 # UTILISATION
 # ============================================================================
 
-
-# Chargez votre DataFrame et utilisez la fonction principale
-visualizations = analyze_prenoms(df)
-
 # Exemple de statistiques descriptives
 
 
 def print_summary_stats(df):
     """Affiche quelques statistiques descriptives"""
+    df = clean_data(df).df
     print("=== STATISTIQUES DESCRIPTIVES ===")
     print(f"Période couverte: {df['années'].min()} - {df['années'].max()}")
     print(f"Nombre total de prénoms uniques: {df['prénom'].nunique()}")
@@ -371,14 +405,20 @@ def print_summary_stats(df):
 
     print("\nTop 10 prénoms masculins:")
     top_m = df[df['sexe'] == 'M'].groupby(
-        'prénom')['nombre'].sum().nlargest(10)
+        'prénom', observed=True)['nombre'].sum().nlargest(10)
     for nom, count in top_m.items():
         print(f"  {nom}: {count:,}")
 
     print("\nTop 10 prénoms féminins:")
     top_f = df[df['sexe'] == 'F'].groupby(
-        'prénom')['nombre'].sum().nlargest(10)
+        'prénom', observed=True)['nombre'].sum().nlargest(10)
     for nom, count in top_f.items():
         print(f"  {nom}: {count:,}")
 
-# print_summary_stats(df)
+
+if __name__ == '__main__':
+    # Chargez votre DataFrame et utilisez la fonction principale
+    df = load_data()
+    visualizations = analyze_prenoms(df)
+
+    # print_summary_stats(df)
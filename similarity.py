@@ -0,0 +1,298 @@
+"""Prénoms aux trajectoires semblables (« évolué comme X ») et familles
+
+    python similarity.py LÉO EMMA --csv dpt2020.csv -k 10 --clusters 12
+
+Chaque prénom devient un vecteur de longueur fixe : sa part des naissances
+de chaque année (série prénom × année du tenseur de comptes divisée par le
+total de l'année), lissée sur quelques années, centrée et normée. Le
+produit scalaire de deux vecteurs est alors la corrélation des deux
+trajectoires : les k plus proches voisins d'un lot de prénoms s'obtiennent
+par un produit matriciel sur tout le vocabulaire. Les familles de
+trajectoires sont des k-moyennes sphériques sur les mêmes vecteurs ; la
+recherche approchée s'en sert comme listes inversées (environ √n familles)
+et ne compare la requête qu'aux prénoms des `n_probe` familles les plus
+proches.
+"""
+import argparse
+from functools import cached_property
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from data_loader import DEFAULT_CSV, load_prenoms
+from tensor_backend import CountTensor
+
+
+def _lisser(x, fenetre):
+    """Moyenne glissante centrée sur `fenetre` années (bords tronqués)"""
+    if fenetre <= 1:
+        return x
+    cumul = np.concatenate([np.zeros((len(x), 1)), np.cumsum(x, axis=1)], axis=1)
+    n = x.shape[1]
+    debut = np.clip(np.arange(n) - fenetre // 2, 0, n)
+    fin = np.clip(np.arange(n) + fenetre - fenetre // 2, 0, n)
+    return (cumul[:, fin] - cumul[:, debut]) / (fin - debut)
+
+
+def _top_k(scores, k):
+    """Indices des k meilleurs scores de chaque ligne, triés décroissants"""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    ordre = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1,
+                       kind='stable')
+    return np.take_along_axis(part, ordre, axis=1)
+
+
+def _kmeans(x, n_clusters, n_iter=30, seed=0):
+    """k-moyennes sphériques de vecteurs normés : (centres, étiquettes)"""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(x))
+    # Initialisation k-means++ (distance = 1 - corrélation)
+    centres = [x[rng.integers(len(x))]]
+    distance = 1 - x @ centres[0]
+    for _ in range(1, n_clusters):
+        poids = np.maximum(distance, 0) ** 2
+        if poids.sum() == 0:
+            poids = np.ones(len(x))
+        centres.append(x[rng.choice(len(x), p=poids / poids.sum())])
+        distance = np.minimum(distance, 1 - x @ centres[-1])
+    centres = np.array(centres)
+
+    etiquettes = None
+    for _ in range(n_iter):
+        nouvelles = np.argmax(x @ centres.T, axis=1)
+        if etiquettes is not None and np.array_equal(nouvelles, etiquettes):
+            break
+        etiquettes = nouvelles
+        sommes = np.zeros_like(centres)
+        np.add.at(sommes, etiquettes, x)
+        normes = np.linalg.norm(sommes, axis=1)
+        # Famille vide : son centre est gardé
+        centres = np.where(normes[:, None] > 0,
+                           sommes / np.where(normes > 0, normes, 1)[:, None],
+                           centres)
+    return centres, etiquettes
+
+
+class TrajectoryIndex:
+    """Vecteurs de trajectoire normés de tous les prénoms (prénom × année)"""
+
+    def __init__(self, data, min_total=20, window=3):
+        # `data` : CountTensor, ou DataFrame (schéma de load_prenoms ou script)
+        tensor = data if isinstance(data, CountTensor) else CountTensor(data)
+        serie = tensor.marginal(('prenom', 'annee')).astype(np.float64)
+        totaux = serie.sum(axis=1)
+        garde = totaux >= min_total
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            part = np.nan_to_num(serie[garde] / serie.sum(axis=0))
+        part = _lisser(part, window)
+        centre = part - part.mean(axis=1, keepdims=True)
+        norme = np.linalg.norm(centre, axis=1)
+        # Série constante (prénom présent partout à l'identique) : pas de forme
+        codes = np.flatnonzero(garde)[norme > 0]
+
+        self.names = tensor.names[codes]
+        self.annees = tensor.annees
+        self.totals = totaux[codes].astype(np.int64)
+        self.shares = part[norme > 0].astype(np.float32)
+        self.vectors = (centre[norme > 0] / norme[norme > 0, None]).astype(
+            np.float32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def codes(self, names):
+        """Positions des prénoms dans l'index (ValueError si absents)"""
+        codes = self.names.get_indexer(list(names))
+        if (codes < 0).any():
+            absents = [n for n, c in zip(names, codes) if c < 0]
+            raise ValueError(f"Prénoms absents de l'index : {absents}")
+        return codes
+
+    @cached_property
+    def _listes(self):
+        """Listes inversées de la recherche approchée (centres, ordre, bornes)"""
+        n_listes = max(1, int(np.sqrt(len(self))))
+        centres, etiquettes = _kmeans(self.vectors, n_listes, n_iter=10)
+        ordre = np.argsort(etiquettes, kind='stable')
+        bornes = np.searchsorted(etiquettes[ordre], np.arange(len(centres) + 1))
+        return centres, ordre, bornes
+
+    def _voisins_approches(self, requetes, k, n_probe):
+        """k meilleurs candidats des `n_probe` listes les plus proches
+
+        Boucle sur les listes sondées (et non sur les requêtes) : chaque
+        liste est comparée d'un coup à toutes les requêtes qui la sondent.
+        """
+        centres, ordre, bornes = self._listes
+        k = min(k, len(self))
+        sondees = _top_k(requetes @ centres.T, n_probe)
+        indices = np.full((len(requetes), k), -1, dtype=np.int64)
+        scores = np.full((len(requetes), k), -np.inf, dtype=np.float32)
+        for j in np.unique(sondees):
+            lignes = np.flatnonzero((sondees == j).any(axis=1))
+            membres = ordre[bornes[j]:bornes[j + 1]]
+            tous = np.concatenate([scores[lignes], requetes[lignes] @
+                                   self.vectors[membres].T], axis=1)
+            candidats = np.concatenate([indices[lignes], np.broadcast_to(
+                membres, (len(lignes), len(membres)))], axis=1)
+            meilleurs = _top_k(tous, k)
+            scores[lignes] = np.take_along_axis(tous, meilleurs, axis=1)
+            indices[lignes] = np.take_along_axis(candidats, meilleurs, axis=1)
+        # Moins de k candidats dans les listes sondées : recherche exacte
+        incompletes = (indices < 0).any(axis=1)
+        if incompletes.any():
+            indices[incompletes] = _top_k(
+                requetes[incompletes] @ self.vectors.T, k)
+        return indices
+
+    def _voisins(self, requetes, k, approx, n_probe, exclure):
+        """(indices, scores) des k voisins de chaque vecteur de `requetes`"""
+        k_plus = k + (exclure is not None)
+        if approx:
+            indices = self._voisins_approches(requetes, k_plus, n_probe)
+        else:
+            indices = _top_k(requetes @ self.vectors.T, k_plus)
+        if exclure is not None:
+            # Le prénom lui-même est retiré de ses voisins
+            autres = indices != exclure[:, None]
+            autres[autres.all(axis=1), -1] = False
+            indices = indices[autres].reshape(len(indices), -1)
+        scores = np.einsum('qd,qkd->qk', requetes, self.vectors[indices])
+        return indices, scores
+
+    def neighbors(self, names, k=10, approx=False, n_probe=8):
+        """Les k prénoms aux trajectoires les plus corrélées à chaque prénom
+
+        Colonnes prénom, voisin, rang, similarity (corrélation) et total du
+        voisin. `approx` : seuls les prénoms des `n_probe` familles les plus
+        proches de la requête sont comparés.
+        """
+        codes = self.codes(names)
+        indices, scores = self._voisins(self.vectors[codes], k, approx,
+                                        n_probe, codes)
+        return pd.DataFrame({
+            'prénom': np.repeat(self.names[codes], indices.shape[1]),
+            'voisin': self.names[indices.ravel()],
+            'rang': np.tile(np.arange(1, indices.shape[1] + 1), len(codes)),
+            'similarity': scores.ravel(),
+            'total': self.totals[indices.ravel()],
+        })
+
+    def neighbor_graph(self, k=10, approx=False, n_probe=8, batch=1024):
+        """Les k voisins de tous les prénoms, par lots de `batch` requêtes
+
+        Renvoie (indices, scores), deux tableaux (prénoms × k).
+        """
+        indices = np.empty((len(self), k), dtype=np.int64)
+        scores = np.empty((len(self), k), dtype=np.float32)
+        for debut in range(0, len(self), batch):
+            lot = np.arange(debut, min(debut + batch, len(self)))
+            indices[lot], scores[lot] = self._voisins(
+                self.vectors[lot], k, approx, n_probe, lot)
+        return indices, scores
+
+    def clusters(self, n_clusters=12, n_iter=30, seed=0):
+        """Familles de trajectoires : k-moyennes sphériques sur les vecteurs
+
+        Colonnes prénom, cluster, similarity (au centre de la famille) et
+        total ; les familles sont numérotées par naissances décroissantes.
+        """
+        centres, etiquettes = _kmeans(self.vectors, n_clusters, n_iter, seed)
+        n_clusters = len(centres)
+        poids = np.bincount(etiquettes, self.totals, minlength=n_clusters)
+        rang = np.empty(n_clusters, dtype=np.int64)
+        rang[np.argsort(-poids, kind='stable')] = np.arange(n_clusters)
+        return pd.DataFrame({
+            'prénom': self.names,
+            'cluster': rang[etiquettes],
+            'similarity': np.einsum('nd,nd->n', self.vectors,
+                                    centres[etiquettes]),
+            'total': self.totals,
+        })
+
+    def profiles(self, clusters):
+        """Part moyenne des naissances par année de chaque famille (en ‰)"""
+        codes = self.codes(clusters['prénom'])
+        profils = pd.DataFrame(self.shares[codes] * 1000, columns=self.annees)
+        profils['cluster'] = clusters['cluster'].to_numpy()
+        profils = profils.groupby('cluster').mean()
+        return profils.reset_index().melt(
+            id_vars='cluster', var_name='années', value_name='pour_mille')
+
+
+# ============================================================================
+# GRAPHIQUES
+# ============================================================================
+
+def neighbors_chart(index, name, k=8, approx=False):
+    """Trajectoire d'un prénom et de ses k voisins (‰ des naissances)"""
+    voisins = index.neighbors([name], k, approx)
+    noms = [name] + voisins['voisin'].tolist()
+    codes = index.codes(noms)
+    data = pd.DataFrame(index.shares[codes] * 1000, columns=index.annees)
+    data['prénom'] = noms
+    data = data.melt(id_vars='prénom', var_name='années',
+                     value_name='pour_mille')
+    data['référence'] = data['prénom'] == name
+
+    return alt.Chart(data).mark_line().encode(
+        x=alt.X('années:Q', title='Année'),
+        y=alt.Y('pour_mille:Q', title='‰ des naissances'),
+        color=alt.Color('prénom:N', sort=noms, title='Prénom'),
+        strokeWidth=alt.condition(alt.datum['référence'], alt.value(3),
+                                  alt.value(1)),
+        tooltip=['prénom', 'années', alt.Tooltip('pour_mille:Q', format='.3f')]
+    ).properties(
+        width=700,
+        height=350,
+        title=f'Prénoms dont la trajectoire ressemble à {name}'
+    )
+
+
+def clusters_chart(index, clusters, exemples=3):
+    """Profil moyen de chaque famille, avec ses prénoms les plus donnés"""
+    profils = index.profiles(clusters)
+    legende = clusters.sort_values('total', ascending=False).groupby(
+        'cluster')['prénom'].apply(lambda s: ', '.join(map(str, s[:exemples])))
+    taille = clusters.groupby('cluster').size()
+    profils['famille'] = profils['cluster'].map(
+        lambda c: f'{c} ({taille[c]} prénoms) : {legende[c]}')
+
+    return alt.Chart(profils).mark_area(opacity=0.7).encode(
+        x=alt.X('années:Q', title='Année'),
+        y=alt.Y('pour_mille:Q', title='‰ moyen des naissances'),
+        tooltip=['famille', 'années', alt.Tooltip('pour_mille:Q', format='.3f')]
+    ).properties(
+        width=220,
+        height=120
+    ).facet(
+        facet=alt.Facet('famille:N', title='Familles de trajectoires'),
+        columns=3
+    ).resolve_scale(y='independent')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*')
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--approx', action='store_true')
+    parser.add_argument('--min-total', type=int, default=20)
+    parser.add_argument('--clusters', type=int, default=0,
+                        help="nombre de familles de trajectoires (0 = aucune)")
+    args = parser.parse_args()
+
+    index = TrajectoryIndex(load_prenoms(args.csv), min_total=args.min_total)
+    print(f"{len(index):,} prénoms, {len(index.annees)} années")
+    if args.names:
+        print(index.neighbors([n.upper() for n in args.names], args.k,
+                              args.approx).to_string(index=False))
+    if args.clusters:
+        familles = index.clusters(args.clusters)
+        print(familles.sort_values('total', ascending=False)
+              .groupby('cluster').head(5).sort_values(['cluster', 'total'],
+                                                      ascending=[True, False])
+              .to_string(index=False))
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from data_loader import iter_csv
+from dataset import clean_data
+from rollup import RollupCube
+
+# ============================================================================
+# AGRÉGATION EN FLUX POUR LES FICHIERS PLUS GROS QUE LA MÉMOIRE
+# ============================================================================
+#
+# Le CSV (même schéma sexe;preusuel;annais;dpt;nombre) est lu par morceaux
+# de `chunksize` lignes. Chaque morceau est filtré, agrégé, puis fusionné
+# dans les agrégats courants : la mémoire utilisée dépend de la taille d'un
+# morceau et de celle des agrégats, pas de celle du fichier.
+#
+#     from script import analyze_prenoms
+#     analyze_prenoms(stream_cube('communes.csv', chunksize=200_000))
+
+CHUNKSIZE = 500_000
+
+
+def _cumuler(acc, partiel):
+    """Ajoute un agrégat partiel (Series indexée par les clés) au cumul"""
+    if acc is None:
+        return partiel
+    cles = list(acc.index.names)
+    return pd.concat([acc, partiel]).groupby(level=cles, sort=False).sum()
+
+
+def _finaliser(acc, colonnes):
+    """Series cumulée -> table triée, clés textuelles en catégories"""
+    table = acc.sort_index().reset_index()
+    for col in colonnes:
+        if col in ('prénom', 'dpt'):
+            table[col] = pd.Categorical(table[col])
+    return table
+
+
+def stream_cube(csv_path, chunksize=CHUNKSIZE, year_ranges=((2010, 2020),)):
+    """RollupCube calculé en une lecture par morceaux du CSV
+
+    `year_ranges` liste les périodes pour lesquelles la table
+    (dpt, prénom, sexe) est pré-agrégée (None = toute la période) ; la
+    période par défaut est celle de create_regional_visualizations.
+    """
+    cles = {
+        'nom_annee_sexe': ['prénom', 'années', 'sexe'],
+        'dpt_annee': ['dpt', 'années'],
+    }
+    periodes = [tuple(p) if p else None for p in year_ranges]
+    cumuls = dict.fromkeys(list(cles) + periodes)
+
+    for morceau in iter_csv(csv_path, chunksize=chunksize):
+        morceau.columns = ['sexe', 'prénom', 'années', 'dpt', 'nombre']
+        df = clean_data(morceau).df
+
+        for nom, colonnes in cles.items():
+            cumuls[nom] = _cumuler(cumuls[nom], df.groupby(
+                colonnes, observed=True)['nombre'].sum())
+        for periode in periodes:
+            sous_df = df if periode is None else \
+                df[df['années'].between(periode[0], periode[1])]
+            cumuls[periode] = _cumuler(cumuls[periode], sous_df.groupby(
+                ['dpt', 'prénom', 'sexe'], observed=True)['nombre'].sum())
+
+    return RollupCube.from_tables(
+        _finaliser(cumuls['nom_annee_sexe'], cles['nom_annee_sexe']),
+        _finaliser(cumuls['dpt_annee'], cles['dpt_annee']),
+        {p: _finaliser(cumuls[p], ['dpt', 'prénom', 'sexe']) for p in periodes},
+    )
+
+
+if __name__ == '__main__':
+    import sys
+
+    cube = stream_cube(sys.argv[1],
+                       int(sys.argv[2]) if len(sys.argv) > 2 else CHUNKSIZE)
+    print(f"{len(cube.nom_annee_sexe):,} lignes (prénom, années, sexe), "
+          f"{len(cube.nom_totaux):,} prénoms")
@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+
+from dataset import SEXES, clean_data
+
+# ============================================================================
+# TENSEUR DES NAISSANCES (sexe × prénom × année × département)
+# ============================================================================
+#
+# Le tableau 4-D complet compterait des centaines de millions de cases
+# presque toutes vides : il est gardé sous forme de coordonnées (un code
+# entier par axe et par ligne, format COO). Chaque marginale (somme sur
+# les axes non demandés) est un np.bincount sur un indice linéaire, donc un
+# tableau dense de petite taille, et les calculs de script.py (top N,
+# pourcentage régional, coefficient de variation, ratio M/F) deviennent des
+# réductions sur ces tableaux, sans groupby ni merge.
+
+AXES = ('sexe', 'prenom', 'annee', 'dpt')
+
+
+class CountTensor:
+    """Naissances en coordonnées (sexe, prénom, année, dpt) -> nombre"""
+
+    def __init__(self, data):
+        # Schéma de data_loader (preusuel, annais, sexe 1/2) ou de script.py
+        if isinstance(data, pd.DataFrame) and 'preusuel' in data.columns:
+            sexe = data['sexe'].to_numpy() - 1
+            prenoms, annees = data['preusuel'], data['annais']
+        else:
+            data = clean_data(data).df
+            sexe = data['sexe'].cat.codes.to_numpy()
+            prenoms, annees = data['prénom'], data['années']
+        prenoms = prenoms.astype('category').cat
+        dpts = data['dpt'].astype('category').cat
+        annees = annees.to_numpy()
+
+        self.names = prenoms.categories
+        self.dpts = dpts.categories
+        self.annee_min = int(annees.min())
+        self.annees = np.arange(self.annee_min, int(annees.max()) + 1)
+        self.codes = {
+            'sexe': sexe.astype(np.int8),
+            'prenom': prenoms.codes.to_numpy(),
+            'annee': (annees - self.annee_min).astype(np.int16),
+            'dpt': dpts.codes.to_numpy(),
+        }
+        self.nombre = data['nombre'].to_numpy()
+        self.shape = {'sexe': len(SEXES), 'prenom': len(self.names),
+                      'annee': len(self.annees), 'dpt': len(self.dpts)}
+        self._marginales = {}
+
+    def __len__(self):
+        return len(self.nombre)
+
+    def marginal(self, axes, year_range=None):
+        """Tableau dense des naissances sommées sur les autres axes
+
+        `axes` donne l'ordre des dimensions du résultat, par exemple
+        ('dpt', 'prenom', 'sexe').
+        """
+        cle = (tuple(axes), tuple(year_range) if year_range else None)
+        if cle not in self._marginales:
+            garde = self._garde(year_range)
+            indice = np.zeros(len(self.nombre) if year_range is None
+                              else int(np.count_nonzero(garde)), np.int64)
+            for axe in axes:
+                indice *= self.shape[axe]
+                indice += self.codes[axe][garde]
+            forme = tuple(self.shape[axe] for axe in axes)
+            self._marginales[cle] = np.bincount(
+                indice, self.nombre[garde], minlength=int(np.prod(forme))
+            ).astype(np.int64).reshape(forme)
+        return self._marginales[cle]
+
+    def top_names(self, n, sexe=None):
+        """Les n prénoms les plus donnés (comme RollupCube.top_prenoms)"""
+        totaux = self.marginal(('sexe', 'prenom'))
+        totaux = totaux.sum(axis=0) if sexe is None else \
+            totaux[SEXES.index(sexe)]
+        return self.names[np.argsort(-totaux, kind='stable')[:n]].tolist()
+
+    def _codes(self, names=None):
+        """Codes triés et uniques des prénoms connus de `names` (None = tous)"""
+        if names is None:
+            return np.arange(len(self.names))
+        codes = np.unique(self.names.get_indexer(list(names)))
+        return codes[codes >= 0]
+
+    def yearly_counts(self, names=None):
+        """Naissances non nulles par (prénom, années, sexe)
+
+        Comme RollupCube.nom_annee_sexe, limitées aux prénoms `names`.
+        """
+        codes = self._codes(names)
+        serie = self.marginal(('prenom', 'annee', 'sexe'))[codes]
+        p, a, s = np.nonzero(serie)
+        return pd.DataFrame({
+            'prénom': pd.Categorical.from_codes(codes[p], self.names),
+            'années': self.annees[a],
+            'sexe': pd.Categorical.from_codes(s, SEXES),
+            'nombre': serie[p, a, s],
+        })
+
+    def year_name(self, names=None):
+        """Naissances non nulles par (années, prénom), tous sexes confondus"""
+        codes = self._codes(names)
+        serie = self.marginal(('annee', 'prenom'))[:, codes]
+        a, p = np.nonzero(serie)
+        return pd.DataFrame({
+            'années': self.annees[a],
+            'prénom': pd.Categorical.from_codes(codes[p], self.names),
+            'nombre': serie[a, p],
+        })
+
+    def mixed(self, min_per_sex=1, limit=None):
+        """Prénoms avec au moins `min_per_sex` naissances pour chaque sexe
+
+        Dans l'ordre alphabétique, comme GenderMixIndex.mixed.
+        """
+        totaux = self.marginal(('prenom', 'sexe'))
+        codes = np.flatnonzero((totaux >= min_per_sex).all(axis=1))
+        return self.names[codes[:limit]].tolist()
+
+    def _garde(self, year_range):
+        """Masque des entrées COO dans la période (None = toutes)"""
+        if not year_range:
+            return slice(None)
+        a = self.codes['annee']
+        return ((a >= year_range[0] - self.annee_min) &
+                (a <= year_range[1] - self.annee_min))
+
+    def _cases(self, year_range=None):
+        """Cases (dpt, prénom, sexe) non vides, réduites depuis les entrées COO
+
+        (d, p, s, nombre, total_dept) : codes et naissances de chaque case,
+        total des naissances de chaque département. Le cube dense n'est
+        jamais construit.
+        """
+        cle = ('cases', tuple(year_range) if year_range else None)
+        if cle not in self._marginales:
+            garde = self._garde(year_range)
+            dpt = self.codes['dpt'][garde].astype(np.int64)
+            nombre = self.nombre[garde]
+            indice = (dpt * self.shape['prenom'] +
+                      self.codes['prenom'][garde]) * self.shape['sexe'] + \
+                self.codes['sexe'][garde]
+            cles, inverse = np.unique(indice, return_inverse=True)
+            somme = np.bincount(inverse.ravel(), nombre,
+                                minlength=len(cles)).astype(np.int64)
+            total_dept = np.bincount(dpt, nombre, minlength=self.shape[
+                'dpt']).astype(np.int64)
+            d, reste = np.divmod(cles, self.shape['prenom'] * self.shape['sexe'])
+            p, s = np.divmod(reste, self.shape['sexe'])
+            non_vides = somme > 0
+            self._marginales[cle] = (d[non_vides], p[non_vides], s[non_vides],
+                                     somme[non_vides], total_dept)
+        return self._marginales[cle]
+
+    def regional_share(self, year_range=None):
+        """Équivalent de prepare_regional_data : une ligne par case non vide
+
+        Colonnes dpt, prénom, sexe, nombre, total_dept et pourcentage
+        (part des naissances du département sur la période).
+        """
+        d, p, s, nombre, total_dept = self._cases(year_range)
+        return pd.DataFrame({
+            'dpt': pd.Categorical.from_codes(d, self.dpts),
+            'prénom': pd.Categorical.from_codes(p, self.names),
+            'sexe': pd.Categorical.from_codes(s, SEXES),
+            'nombre': nombre,
+            'total_dept': total_dept[d],
+            'pourcentage': nombre / total_dept[d] * 100,
+        })
+
+    def regional_variation(self, names=None, year_range=None):
+        """Moyenne, écart-type et coefficient de variation des pourcentages
+
+        Statistiques sur les cases (dpt, sexe) non vides de chaque prénom,
+        comme le graphique de variance de create_regional_visualizations.
+        """
+        d, p, _, nombre, total_dept = self._cases(year_range)
+        codes = self._codes(names)
+        if names is not None:
+            garde = np.isin(p, codes)
+            d, p, nombre = d[garde], p[garde], nombre[garde]
+        pct = nombre / total_dept[d] * 100
+        taille = len(self.names)
+        n = np.bincount(p, minlength=taille)[codes]
+        somme = np.bincount(p, pct, minlength=taille)[codes]
+        carres = np.bincount(p, pct ** 2, minlength=taille)[codes]
+        total = np.bincount(p, nombre, minlength=taille)[codes].astype(np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moyenne = somme / n
+            ecart = np.sqrt(np.maximum(carres - n * moyenne ** 2, 0) / (n - 1))
+        garde = n > 0
+        return pd.DataFrame({
+            'prénom': pd.Categorical.from_codes(codes[garde], self.names),
+            'mean_pct': moyenne[garde],
+            'std_pct': ecart[garde],
+            'total': total[garde],
+            'cv': ecart[garde] / moyenne[garde],
+        })
+
+    def mf_ratio(self, names=None):
+        """Log10((M+1)/(F+1)) par prénom et par année : (prénoms, tableau)
+
+        Le tableau a une ligne par prénom et une colonne par année de
+        `self.annees` ; les années sans naissance valent NaN.
+        """
+        serie = self.marginal(('prenom', 'sexe', 'annee'))
+        codes = np.arange(len(self.names)) if names is None else \
+            self.names.get_indexer(list(names))
+        codes = codes[codes >= 0]
+        m, f = serie[codes, 0], serie[codes, 1]
+        ratio = np.log10((m + 1) / (f + 1))
+        ratio[(m + f) == 0] = np.nan
+        return self.names[codes].tolist(), ratio
+
+    def log_ratio_series(self, names):
+        """Lignes de mf_ratio où le prénom est donné (comme GenderMixIndex)
+
+        Colonnes prénom, années, M, F, ratio_mf et total.
+        """
+        noms, ratio = self.mf_ratio(self.names[self._codes(names)])
+        codes = self.names.get_indexer(noms)
+        serie = self.marginal(('prenom', 'sexe', 'annee'))[codes]
+        i, j = np.nonzero(~np.isnan(ratio))
+        m, f = serie[i, 0, j], serie[i, 1, j]
+        return pd.DataFrame({
+            'prénom': pd.Categorical.from_codes(codes[i], self.names),
+            'années': self.annees[j],
+            'M': m,
+            'F': f,
+            'ratio_mf': ratio[i, j],
+            'total': m + f,
+        })
+
+    def male_share(self):
+        """Part des naissances masculines de chaque prénom (toutes années)"""
+        totaux = self.marginal(('prenom', 'sexe'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.Series(totaux[:, 0] / totaux.sum(axis=1), index=self.names)
+
+    def dpt_name_matrix(self, year_range=None, sexe=None):
+        """Matrice creuse scipy.sparse (dpt × prénom), si scipy est installé
+
+        Sans scipy, le tableau dense équivalent.
+        """
+        cases = self.marginal(('dpt', 'prenom', 'sexe'), year_range)
+        cases = cases.sum(axis=2) if sexe is None else \
+            cases[:, :, SEXES.index(sexe)]
+        try:
+            from scipy import sparse
+        except ImportError:
+            return cases
+        return sparse.csr_matrix(cases)
+
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# UNISEX NAMES: balance, top-N selection and signed pyramid data
+# ============================================================================
+#
+# Works on the loader schema (sexe 1/2, preusuel, annais, dpt, nombre).
+# Everything is done with groupby/unstack and array arithmetic, so the same
+# functions handle a handful of names or the whole vocabulary.
+
+SEX_LABELS = ['Male', 'Female']  # INSEE codes 1 and 2
+
+
+def sex_totals(df):
+    """Total births per name with M/F columns, total and proportions"""
+    counts = (
+        df
+        .groupby(['preusuel', 'sexe'], observed=True)['nombre']
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(columns=[1, 2], fill_value=0)
+        .rename(columns={1: 'M', 2: 'F'})
+    )
+    counts.columns.name = None
+    counts['total'] = counts['M'] + counts['F']
+    counts['p_male'] = counts['M'] / counts['total']
+    counts['p_female'] = counts['F'] / counts['total']
+    return counts
+
+
+def top_unisex(df, n=5, min_share=0.20):
+    """The n most given names where each sex gets at least `min_share`"""
+    counts = sex_totals(df)
+    balanced = counts[(counts['p_male'] >= min_share) &
+                      (counts['p_female'] >= min_share)]
+    return balanced['total'].nlargest(n).index.tolist()
+
+
+def pyramid_frame(df, names=None):
+    """Births per (name, sex, year) with a signed count for pyramid charts
+
+    Girls get a negative `nombre_signed`. `names=None` keeps every name.
+    """
+    if names is not None:
+        df = df[df['preusuel'].isin(names)]
+    grouped = df.groupby(['preusuel', 'sexe', 'annais'], as_index=False,
+                         observed=True)['nombre'].sum()
+
+    sexe = grouped['sexe'].to_numpy()
+    grouped['nombre_signed'] = np.where(sexe == 2, -grouped['nombre'],
+                                        grouped['nombre'])
+    grouped['Sex'] = pd.Categorical.from_codes(sexe - 1, SEX_LABELS)
+    if names is not None and isinstance(grouped['preusuel'].dtype,
+                                        pd.CategoricalDtype):
+        grouped['preusuel'] = grouped['preusuel'].cat.remove_unused_categories()
+    return grouped